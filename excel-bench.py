@@ -0,0 +1,324 @@
+"""Benchmarks de excel-cli con libros sintéticos.
+
+Genera libros de tamaño configurable (filas, columnas, mezcla de tipos, tasa
+de duplicados y columnas de fecha), y mide cada operación de excel-cli
+(carga, análisis, perfil, duplicados, reportes y exportaciones) en un proceso
+nuevo para que el pico de memoria de una no contamine a la siguiente.
+Los resultados se guardan en JSON y se pueden comparar entre versiones.
+
+Uso:
+    python excel-bench.py --sizes 10000,100000,1000000 --output bench.json
+    python excel-bench.py --sizes 10000,100000 --compare bench.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import builtins
+import tempfile
+import tracemalloc
+import importlib.util
+import multiprocessing
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+TYPES = ('int', 'float', 'text', 'category')
+
+def load_excel_cli():
+    spec = importlib.util.spec_from_file_location('excel_cli', HERE / 'excel-cli.py')
+    module = importlib.util.module_from_spec(spec)
+    # Registrado para que pickle encuentre las funciones de los workers por nombre
+    sys.modules['excel_cli'] = module
+    spec.loader.exec_module(module)
+    return module
+
+def parse_mix(text):
+    """'int=3,float=2,text=3,category=2' -> pesos por tipo"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in TYPES:
+            raise ValueError(f"Tipo desconocido en la mezcla: {name} (usa {', '.join(TYPES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def synthetic_frame(rows, columns=10, mix=None, dup_rate=0.05, date_columns=2, seed=42):
+    """DataFrame sintético: id, email y `columns` columnas repartidas según `mix`, más fechas.
+
+    Una fracción `dup_rate` de las filas repite otra fila completa (mismo email).
+    Las columnas de fecha alternan fechas reales y texto 'YYYY-MM-DD'.
+    """
+    rng = np.random.default_rng(seed)
+    mix = mix or {'int': 3, 'float': 2, 'text': 3, 'category': 2}
+    total = sum(mix.values())
+    counts = {name: int(round(columns * weight / total)) for name, weight in mix.items()}
+    # Ajuste por redondeo para que la suma sea exactamente `columns`
+    counts[max(counts, key=counts.get)] += columns - sum(counts.values())
+
+    unique_rows = max(1, int(rows * (1 - dup_rate)))
+    source = np.concatenate([np.arange(unique_rows), rng.integers(0, unique_rows, rows - unique_rows)])
+    rng.shuffle(source)
+
+    data = {'id': np.arange(1, rows + 1), 'email': np.char.add(np.char.add('cliente', source.astype(str)), '@ejemplo.com')}
+    for i in range(counts.get('int', 0)):
+        data[f'entero_{i + 1}'] = (source * (i + 7) % 100000).astype(np.int64)
+    for i in range(counts.get('float', 0)):
+        data[f'monto_{i + 1}'] = np.round((source * 0.37 * (i + 1)) % 10000, 2)
+    for i in range(counts.get('text', 0)):
+        data[f'texto_{i + 1}'] = np.char.add(f'descripcion {i + 1} ', (source % 50000).astype(str))
+    for i in range(counts.get('category', 0)):
+        labels = np.array(['Nuevo', 'Contactado', 'Calificado', 'Cerrado', 'Perdido', 'Pendiente'])
+        data[f'estado_{i + 1}'] = labels[(source + i) % len(labels)]
+    base = np.datetime64('2023-01-01')
+    for i in range(date_columns):
+        dates = base + (source * (i + 3) % 730).astype('timedelta64[D]')
+        data[f'fecha_{i + 1}'] = pd.to_datetime(dates) if i % 2 == 0 else np.datetime_as_string(dates, unit='D')
+    return pd.DataFrame(data)
+
+def generate_workbook(ex, path, rows, columns, mix, dup_rate, date_columns, seed):
+    """Escribe el libro sintético con el escritor en streaming de excel-cli"""
+    df = synthetic_frame(rows, columns, mix, dup_rate, date_columns, seed)
+    try:
+        import xlsxwriter  # noqa: F401
+        backend = 'xlsxwriter'
+    except ImportError:
+        backend = 'openpyxl'
+    ex.write_excel_chunks(ex.frame_chunks(df, 50000), path, backend, styled=False)
+    return path
+
+# --- medición de memoria ---
+def _reset_peak_rss():
+    # Linux >= 4.0: escribir 5 en clear_refs reinicia VmHWM (pico de RSS)
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return None
+
+class ScriptedInput:
+    """Reemplaza input() con respuestas fijas para recorrer los menús"""
+    def __init__(self, answers):
+        self.answers = list(answers)
+
+    def __call__(self, prompt=''):
+        if not self.answers:
+            raise RuntimeError(f"Sin respuesta para: {prompt}")
+        return str(self.answers.pop(0))
+
+# Marcador que _menu reemplaza por la ruta del libro
+WORKBOOK = object()
+
+def _menu(function_name, answers):
+    """Acción que recorre un menú de excel-cli con respuestas fijas"""
+    def run(ex, workbook):
+        builtins.input = ScriptedInput(workbook if answer is WORKBOOK else answer for answer in answers)
+        getattr(ex, function_name)()
+    return run
+
+def _load(ex, workbook):
+    if not ex.cli.load_file(workbook):
+        raise RuntimeError("load_file falló")
+
+def _stream(ex, workbook):
+    ex.cli.load_file(workbook, streaming=True)
+    for _ in ex.cli.iter_chunks():
+        pass
+
+def _combine(ex, workbook):
+    summary = ex.combine_reports(ex.cli, [workbook, workbook], workers=2)
+    if not summary or summary['errores']:
+        raise RuntimeError("combine_reports no pudo leer los libros")
+
+# Operación -> (preparación, acción medida). La preparación no se cronometra.
+OPERATIONS = {
+    'load': (None, _load),
+    'load_cached': (_load, _load),
+    'load_stream': (None, _stream),
+    'duplicates': (_load, _menu('analyze_data', ['1', 'email'])),
+    'unique': (_load, _menu('analyze_data', ['2', 'email'])),
+    'describe': (_load, _menu('analyze_data', ['3'])),
+    'dates': (_load, _menu('analyze_data', ['4'])),
+    'profile': (_load, lambda ex, workbook: ex.run_profile(ex.cli)),
+    'dedup': (None, lambda ex, workbook: ex.run_dedup(ex.cli, [workbook], ex.parse_key_spec('email:email'), 'bench')),
+    'accumulate': (None, _menu('process_reports', ['1', 's', 'bench', 'email:email', '', WORKBOOK])),
+    'combine': (None, _combine),
+    'export_excel': (_load, _menu('export_results', ['1', 'openpyxl'])),
+    'export_csv': (_load, _menu('export_results', ['2'])),
+    'export_sql': (_load, _menu('export_results', ['3', 'bench', '3'])),
+}
+
+def _run_operation(operation, workbook, workdir, queue):
+    """Se ejecuta en un proceso nuevo: prepara, mide y devuelve tiempo y memoria"""
+    os.chdir(workdir)
+    # El hijo hereda el método 'spawn'; con fork los workers de combine_reports
+    # heredan el módulo excel_cli, que no se puede importar por nombre
+    if 'fork' in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method('fork', force=True)
+    try:
+        ex = load_excel_cli()
+        ex.cli = ex.ExcelCLI()
+        prepare, action = OPERATIONS[operation]
+        with redirect_stdout(io.StringIO()):
+            if prepare:
+                prepare(ex, workbook)
+            # tracemalloc hace mucho más lenta la operación: solo se usa si no
+            # se puede reiniciar el pico de RSS del proceso
+            resettable = _reset_peak_rss()
+            baseline = _peak_rss_mb() if resettable else None
+            traced_peak = None
+            if not resettable:
+                tracemalloc.start()
+            start = time.perf_counter()
+            action(ex, workbook)
+            seconds = time.perf_counter() - start
+            if not resettable:
+                _, traced_peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        peak = _peak_rss_mb()
+        queue.put({
+            'status': 'ok',
+            'seconds': round(seconds, 4),
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+            'rss_before_mb': round(baseline, 1) if baseline is not None else None,
+            'peak_traced_mb': round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None,
+        })
+    except Exception as e:
+        queue.put({'status': 'error', 'error': f"{type(e).__name__}: {str(e)}"})
+
+def measure(operation, workbook, timeout):
+    """Lanza la operación en un proceso aparte; si excede `timeout` se termina y se marca"""
+    workdir = tempfile.mkdtemp(prefix='excel-bench-')
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_operation, args=(operation, str(workbook), workdir, queue))
+    process.start()
+    try:
+        result = queue.get(timeout=timeout)
+    except Exception:
+        result = {'status': 'timeout', 'seconds': timeout}
+    process.join(5)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+def compare(current, previous):
+    """Variación de tiempo y memoria contra una corrida anterior"""
+    print(f"\n=== Comparación con {previous.get('generated', '?')} ===")
+    before = {(r['rows'], r['operation']): r for r in previous.get('results', [])}
+    for result in current['results']:
+        old = before.get((result['rows'], result['operation']))
+        if not old or result['status'] != 'ok' or old.get('status') != 'ok':
+            continue
+        seconds = (result['seconds'] / old['seconds'] - 1) * 100 if old['seconds'] else 0
+        memory = ''
+        key = 'peak_traced_mb' if result.get('peak_traced_mb') and old.get('peak_traced_mb') else 'peak_rss_mb'
+        if result.get(key) and old.get(key):
+            memory = f" | memoria {(result[key] / old[key] - 1) * 100:+7.1f}%"
+        marker = '⚠' if seconds > 10 else '✓'
+        print(f"{marker} {result['rows']:>9,} filas {result['operation']:<14} tiempo {seconds:+7.1f}%{memory}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='excel-bench.py', description="Benchmarks de excel-cli con libros sintéticos")
+    parser.add_argument('--sizes', default='10000,100000', help="filas por libro, separadas por coma (ej. 10000,100000,1000000)")
+    parser.add_argument('--columns', type=int, default=10, help="columnas además de id, email y fechas")
+    parser.add_argument('--mix', default='int=3,float=2,text=3,category=2', help="pesos por tipo de columna")
+    parser.add_argument('--dup-rate', type=float, default=0.05, help="fracción de filas duplicadas")
+    parser.add_argument('--date-columns', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--operations', default=','.join(OPERATIONS), help="operaciones a medir, separadas por coma")
+    parser.add_argument('--timeout', type=float, default=600, help="segundos máximos por operación")
+    parser.add_argument('--data-dir', default='output/bench', help="carpeta para los libros generados (se reutilizan)")
+    parser.add_argument('--output', help="JSON de resultados (default output/bench/excel_bench_<fecha>.json)")
+    parser.add_argument('--compare', help="JSON de una corrida anterior")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"Error en los parámetros: {str(e)}")
+        return 2
+    operations = [name.strip() for name in args.operations.split(',') if name.strip()]
+    unknown = [name for name in operations if name not in OPERATIONS]
+    if unknown:
+        print(f"Operaciones desconocidas: {', '.join(unknown)}")
+        return 2
+
+    ex = load_excel_cli()
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for rows in sizes:
+        mix_tag = '-'.join(f"{name}{weight:g}" for name, weight in mix.items())
+        workbook = (data_dir / f"sintetico_{rows}_{args.columns}c_{mix_tag}_d{args.dup_rate:g}"
+                    f"_f{args.date_columns}_s{args.seed}.xlsx").resolve()
+        if not workbook.exists():
+            print(f"Generando {workbook.name}...")
+            start = time.perf_counter()
+            generate_workbook(ex, workbook, rows, args.columns, mix, args.dup_rate, args.date_columns, args.seed)
+            print(f"✓ Generado en {time.perf_counter() - start:.1f}s ({ex._format_bytes(workbook.stat().st_size)})")
+
+        print(f"\n=== {rows:,} filas ===")
+        for operation in operations:
+            result = measure(operation, workbook, args.timeout)
+            result.update({'rows': rows, 'operation': operation})
+            results.append(result)
+            if result['status'] == 'ok':
+                rss = f"{result['peak_rss_mb']:,.0f} MB" if result.get('peak_rss_mb') is not None else "N/A"
+                traced = f" | pico Python {result['peak_traced_mb']:,.0f} MB" if result.get('peak_traced_mb') is not None else ""
+                print(f"✓ {operation:<14} {result['seconds']:>9.2f}s | pico RSS {rss:>9}{traced} | "
+                      f"{rows / max(result['seconds'], 1e-9):,.0f} filas/s")
+            elif result['status'] == 'timeout':
+                print(f"⏱ {operation:<14} superó {args.timeout:.0f}s")
+            else:
+                print(f"❌ {operation:<14} {result['error']}")
+
+    summary = {
+        'generated': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': results,
+    }
+    output = Path(args.output) if args.output else data_dir / f"excel_bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"\n✓ Resultados: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(summary, json.load(f))
+    return 1 if any(result['status'] == 'error' for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,1832 @@
+import time
+_STARTED = time.perf_counter()
 import os
-import pandas as pd
-import numpy as np
+import io
+import sys
+import json
+import argparse
+import re
+import csv
+import glob
+import pickle
+import sqlite3
+import tempfile
+import hashlib
+import importlib
+from contextlib import redirect_stdout
 from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
-import openpyxl
-from openpyxl.styles import PatternFill, Font
-from openpyxl.utils import get_column_letter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+class _LazyModule:
+    """Módulo que se importa en el primer acceso a uno de sus atributos.
+
+    pandas, numpy y openpyxl tardan más de un segundo en cargar; el menú y el
+    generador de fórmulas no los necesitan.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pd = _LazyModule('pandas')
+np = _LazyModule('numpy')
+openpyxl = _LazyModule('openpyxl')
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl')
 
 class ExcelCLI:
     def __init__(self):
         self.current_file = None
         self.df = None
+        self.streaming = False
+        self.chunk_size = 50000
+        self.optimize_dtypes = True
+        self.excel_backend = 'openpyxl'
         self.template_dir = Path('templates')
         self.output_dir = Path('output')
         self.initialize_dirs()
+        self.cache = WorkbookCache(self.output_dir / '.cache')
 
     def initialize_dirs(self):
         self.template_dir.mkdir(exist_ok=True)
         self.output_dir.mkdir(exist_ok=True)
 
-    def load_file(self, filepath):
+    def load_file(self, filepath, streaming=False, chunk_size=None):
         try:
+            if streaming:
+                return self.open_stream(filepath, chunk_size)
             self.current_file = filepath
+            self.streaming = False
+            self.df = self.cache.get(filepath, self.optimize_dtypes)
+            if self.df is not None:
+                print(f"✓ Archivo cargado desde caché: {filepath}")
+                return True
             self.df = pd.read_excel(filepath)
             print(f"✓ Archivo cargado: {filepath}")
+            if self.optimize_dtypes:
+                self.optimize_memory()
+            self.cache.put(filepath, self.df, self.optimize_dtypes)
             return True
         except Exception as e:
             print(f"Error cargando archivo: {str(e)}")
             return False
 
+    def open_stream(self, filepath, chunk_size=None):
+        """Prepara el archivo para leerse por bloques sin cargarlo completo"""
+        if chunk_size:
+            self.chunk_size = int(chunk_size)
+        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            header = next(wb.active.iter_rows(max_row=1, values_only=True), None)
+        finally:
+            wb.close()
+        if not header:
+            raise ValueError("La hoja está vacía")
+        self.current_file = filepath
+        self.df = None
+        self.streaming = True
+        print(f"✓ Archivo abierto en modo streaming: {filepath}")
+        print(f"✓ Columnas: {len(header)} | Tamaño de bloque: {self.chunk_size} filas")
+        return True
+
+    def optimize_memory(self):
+        """Reduce la memoria del DataFrame cargado e imprime el antes/después"""
+        before = self.df.memory_usage(deep=True)
+        old_dtypes = self.df.dtypes
+        self.df = optimize_frame(self.df)
+        after = self.df.memory_usage(deep=True)
+
+        print("\n=== Optimización de memoria ===")
+        for col in self.df.columns:
+            if str(old_dtypes[col]) != str(self.df[col].dtype):
+                print(f"{col}: {old_dtypes[col]} → {self.df[col].dtype} "
+                      f"({_format_bytes(before[col])} → {_format_bytes(after[col])})")
+        total_before, total_after = before.sum(), after.sum()
+        saved = 100 * (1 - total_after / total_before) if total_before else 0
+        print(f"Total: {_format_bytes(total_before)} → {_format_bytes(total_after)} ({saved:.1f}% menos)")
+
+    def raw_frame(self):
+        """Datos cargados con los tipos leídos del archivo, sin optimizar"""
+        if not self.optimize_dtypes or self.current_file is None:
+            return self.df
+        df = self.cache.get(self.current_file, optimized=False)
+        if df is None:
+            df = pd.read_excel(self.current_file)
+            self.cache.put(self.current_file, df, optimized=False)
+        return df
+
+    def has_data(self):
+        return self.df is not None or (self.streaming and self.current_file is not None)
+
+    def iter_chunks(self, filepath=None, chunk_size=None, optimize=None):
+        """Genera DataFrames de `chunk_size` filas usando el iterador read-only de openpyxl.
+
+        Los tipos optimizados se deciden con el primer bloque y se aplican a los
+        siguientes, así todos los bloques de un archivo comparten tipos. Con
+        optimize=False (p. ej. para armar claves) se entregan los tipos leídos.
+        """
+        filepath = filepath or self.current_file
+        chunk_size = int(chunk_size or self.chunk_size)
+        optimize = self.optimize_dtypes if optimize is None else optimize
+        dtypes = {}
+        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = _unique_columns(header)
+            buffer = []
+            start = 0
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    yield self._prepare_chunk(_rows_to_frame(buffer, columns, start), optimize, dtypes)
+                    start += len(buffer)
+                    buffer = []
+            if buffer:
+                yield self._prepare_chunk(_rows_to_frame(buffer, columns, start), optimize, dtypes)
+        finally:
+            wb.close()
+
+    def _prepare_chunk(self, chunk, optimize, dtypes):
+        if not optimize:
+            return chunk
+        if dtypes:
+            return _apply_dtypes(chunk, dtypes)
+        # Sin categorías: cada bloque tendría categorías distintas
+        chunk = optimize_frame(chunk, categorize=False)
+        dtypes.update(chunk.dtypes.items())
+        return chunk
+
+    def chunks(self):
+        """Itera los datos actuales: bloques en modo streaming o el DataFrame completo"""
+        if self.streaming:
+            yield from self.iter_chunks()
+        elif self.df is not None:
+            yield self.df
+
+_DATE_PATTERNS = [
+    (re.compile(r'^\d{4}[-/.]\d{1,2}[-/.]\d{1,2}([ T]\d{1,2}:\d{2}(:\d{2})?.*)?$'), False),
+    (re.compile(r'^\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}( \d{1,2}:\d{2}(:\d{2})?)?$'), True),
+]
+
+def optimize_frame(df, categorize=True, category_ratio=0.5, sample_size=1000, category_min_rows=1000):
+    """Devuelve una copia con tipos más compactos.
+
+    - Texto con pocos valores distintos → category (desde category_min_rows filas;
+      en tablas chicas casi todo pasa la proporción y la categoría no ahorra nada)
+    - Texto con forma de fecha → datetime64
+    - Enteros → el entero más pequeño que los contiene
+    - Flotantes → float32 solo si la conversión no pierde precisión
+    """
+    result = {}
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind
+        if kind in ('i', 'u'):
+            series = pd.to_numeric(series, downcast='unsigned' if len(series) and series.min() >= 0 else 'integer')
+        elif kind == 'f':
+            series = _downcast_float(series)
+        elif kind == 'O' or pd.api.types.is_string_dtype(series.dtype):
+            parsed = _parse_dates(series, sample_size)
+            if parsed is not None:
+                series = parsed
+            elif (categorize and len(series) >= category_min_rows
+                  and series.nunique(dropna=True) / len(series) <= category_ratio):
+                series = series.astype('category')
+        result[col] = series
+    return pd.DataFrame(result, index=df.index)
+
+def _downcast_float(series):
+    values = series.to_numpy()
+    finite = values[~np.isnan(values)]
+    if len(finite) == len(values) and len(values) and np.all(np.mod(finite, 1) == 0):
+        # Fuera del rango de int64 el cast daría basura (1e20 → INT64_MIN)
+        if finite.min() >= -2.0 ** 63 and finite.max() < 2.0 ** 63:
+            return pd.to_numeric(series.astype('int64'), downcast='integer')
+        return series
+    narrowed = values.astype('float32')
+    if np.array_equal(narrowed.astype('float64'), values, equal_nan=True):
+        return series.astype('float32')
+    return series
+
+def _parse_dates(series, sample_size):
+    non_null = series.dropna()
+    if non_null.empty:
+        return None
+    sample = non_null.head(sample_size)
+    if not all(isinstance(v, str) for v in sample):
+        return None
+    sample = sample.str.strip()
+    for pattern, dayfirst in _DATE_PATTERNS:
+        if sample.str.match(pattern).mean() < 0.9:
+            continue
+        parsed = pd.to_datetime(series.where(series.notna(), None), errors='coerce', dayfirst=dayfirst, format='mixed')
+        # Solo aceptar si casi todo lo que tenía valor se pudo convertir
+        if parsed.notna().sum() >= 0.9 * len(non_null):
+            return parsed
+    return None
+
+def _apply_dtypes(chunk, dtypes):
+    """Lleva un bloque a los tipos del primer bloque sin perder valores.
+
+    Si una columna no cabe (un entero mayor, un decimal, texto que no es fecha)
+    se deja con su tipo leído, y ese pasa a ser su tipo para los bloques siguientes.
+    """
+    result = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        target = dtypes.get(col)
+        if target is not None and series.dtype != target:
+            converted = _cast_exact(series, target)
+            if converted is None:
+                dtypes[col] = series.dtype
+            else:
+                series = converted
+        result[col] = series
+    return pd.DataFrame(result, index=chunk.index)
+
+def _cast_exact(series, dtype):
+    if series.isna().all():
+        # Un bloque sin valores no decide nada: se deja tal cual
+        return series.astype(dtype) if dtype.kind in ('f', 'M') else series
+    if dtype.kind == 'M':
+        if series.dtype.kind == 'M':
+            return series.astype(dtype)
+        return _parse_dates(series, len(series))
+    try:
+        converted = series.astype(dtype)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    # Ida y vuelta: descarta desbordes de enteros y decimales truncados o redondeados
+    return converted if converted.astype(series.dtype).equals(series) else None
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+class WorkbookCache:
+    """Caché columnar (Feather sin compresión) de libros ya parseados.
+
+    La clave combina ruta, mtime y tamaño del archivo, así que cualquier cambio
+    en el libro invalida la entrada, y si los tipos se optimizaron: con y sin
+    optimizar son entradas distintas. El archivo se abre con memory-map, pero
+    to_pandas() copia los datos a memoria; lo que se ahorra es el parseo del Excel.
+    """
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, max_age_days=7):
+        self.cache_dir = Path(cache_dir)
+        self.index_file = self.cache_dir / 'index.json'
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.enabled = True
+
+    def _feather(self):
+        try:
+            import pyarrow.feather as feather
+            return feather
+        except ImportError:
+            if self.enabled:
+                print("ℹ Caché desactivada: instala pyarrow para habilitarla")
+            self.enabled = False
+            return None
+
+    def _load_index(self):
+        if not self.index_file.exists():
+            return {}
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp, self.index_file)
+
+    def key(self, filepath, optimized=True):
+        path = Path(filepath).resolve()
+        stat = path.stat()
+        raw = f"{path}|{stat.st_mtime_ns}|{stat.st_size}|{'opt' if optimized else 'raw'}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, filepath, optimized=True):
+        if not self.enabled:
+            return None
+        feather = self._feather()
+        if feather is None:
+            return None
+        index = self._load_index()
+        key = self.key(filepath, optimized)
+        entry = index.get(key)
+        data_file = self.cache_dir / f"{key}.feather"
+        if entry is None or not data_file.exists():
+            return None
+        try:
+            df = feather.read_table(data_file, memory_map=True).to_pandas()
+        except Exception:
+            self._remove(index, key)
+            self._save_index(index)
+            return None
+        entry['last_access'] = time.time()
+        self._save_index(index)
+        return df
+
+    def put(self, filepath, df, optimized=True):
+        if not self.enabled:
+            return False
+        feather = self._feather()
+        if feather is None:
+            return False
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        key = self.key(filepath, optimized)
+        data_file = self.cache_dir / f"{key}.feather"
+        tmp = data_file.with_suffix('.tmp')
+        try:
+            feather.write_feather(df, tmp, compression='uncompressed')
+            os.replace(tmp, data_file)
+        except Exception as e:
+            # Columnas con tipos mezclados o nombres no textuales no se pueden guardar en Arrow
+            tmp.unlink(missing_ok=True)
+            print(f"ℹ No se pudo guardar en caché: {str(e)}")
+            return False
+        index = self._load_index()
+        source = str(Path(filepath).resolve())
+        # Una sola entrada por archivo y variante: las versiones anteriores ya no sirven
+        for old_key in [k for k, e in index.items()
+                        if e.get('source') == source and e.get('optimized', True) == optimized and k != key]:
+            self._remove(index, old_key)
+        now = time.time()
+        index[key] = {
+            'source': source,
+            'optimized': optimized,
+            'bytes': data_file.stat().st_size,
+            'created': now,
+            'last_access': now,
+        }
+        self.evict(index)
+        self._save_index(index)
+        return True
+
+    def evict(self, index=None):
+        """Elimina entradas vencidas y, si se excede el tamaño, las menos usadas"""
+        save = index is None
+        index = self._load_index() if index is None else index
+        now = time.time()
+        for key in [k for k, e in index.items() if now - e.get('created', 0) > self.max_age]:
+            self._remove(index, key)
+        total = sum(e.get('bytes', 0) for e in index.values())
+        for key in sorted(index, key=lambda k: index[k].get('last_access', 0)):
+            if total <= self.max_bytes:
+                break
+            total -= index[key].get('bytes', 0)
+            self._remove(index, key)
+        if save:
+            self._save_index(index)
+
+    def clear(self):
+        index = self._load_index()
+        for key in list(index):
+            self._remove(index, key)
+        self._save_index(index)
+
+    def _remove(self, index, key):
+        index.pop(key, None)
+        (self.cache_dir / f"{key}.feather").unlink(missing_ok=True)
+
+def _unique_columns(header):
+    # Igual que pandas: nombres vacíos como "Unnamed: n" y duplicados con sufijo ".n"
+    columns = []
+    seen = {}
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+def _rows_to_frame(rows, columns, start):
+    width = len(columns)
+    rows = [row[:width] + (None,) * (width - len(row)) for row in rows]
+    return pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(start, start + len(rows)))
+
+EXCEL_MAX_ROWS = 1048576
+HEADER_FILL = 'FF1F4E78'
+HEADER_FONT_COLOR = 'FFFFFFFF'
+
+def frame_chunks(df, chunk_size):
+    """Divide un DataFrame en memoria en vistas de `chunk_size` filas"""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+def _column_widths(chunk, sample=1000):
+    widths = []
+    for col in chunk.columns:
+        values = chunk[col].head(sample).dropna().astype(str)
+        longest = max([len(str(col))] + values.str.len().tolist())
+        widths.append(min(max(longest + 2, 8), 60))
+    return widths
+
+class _OpenpyxlSink:
+    def __init__(self, output_path, styled):
+        self.output_path = output_path
+        self.styled = styled
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = None
+        self.sheets = 0
+        self.rows = 0
+
+    def new_sheet(self, header, widths):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import PatternFill, Font
+        from openpyxl.utils import get_column_letter
+        self.sheets += 1
+        self.ws = self.wb.create_sheet(_sheet_name(self.sheets))
+        # En write-only los anchos deben fijarse antes de la primera fila
+        for i, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(i)].width = width
+        if self.styled:
+            self.ws.freeze_panes = 'A2'
+            cells = []
+            for name in header:
+                cell = WriteOnlyCell(self.ws, value=name)
+                cell.font = Font(bold=True, color=HEADER_FONT_COLOR)
+                cell.fill = PatternFill('solid', start_color=HEADER_FILL)
+                cells.append(cell)
+            self.ws.append(cells)
+        else:
+            self.ws.append(header)
+        self.rows = 0
+
+    def write_rows(self, rows):
+        append = self.ws.append
+        for row in rows:
+            append(row)
+        self.rows += len(rows)
+
+    def add_sheet(self, name, header, rows):
+        from openpyxl.worksheet.formula import ArrayFormula
+        from openpyxl.utils import get_column_letter
+        ws = self.wb.create_sheet(name)
+        ws.append(header)
+        for r, row in enumerate(rows, 2):
+            ws.append([ArrayFormula(f"{get_column_letter(c)}{r}:{get_column_letter(c)}{r + value.rows - 1}", '=' + value.text)
+                       if isinstance(value, SpillFormula) else value for c, value in enumerate(row, 1)])
+
+    def close(self):
+        self.wb.save(self.output_path)
+
+class _XlsxWriterSink:
+    def __init__(self, output_path, styled):
+        import xlsxwriter
+        self.wb = xlsxwriter.Workbook(str(output_path), {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+            'nan_inf_to_errors': True,
+        })
+        self.styled = styled
+        self.header_format = self.wb.add_format({
+            'bold': True, 'font_color': '#' + HEADER_FONT_COLOR[2:], 'bg_color': '#' + HEADER_FILL[2:],
+        }) if styled else None
+        self.ws = None
+        self.sheets = 0
+        self.rows = 0
+
+    def new_sheet(self, header, widths):
+        self.sheets += 1
+        self.ws = self.wb.add_worksheet(_sheet_name(self.sheets))
+        for i, width in enumerate(widths):
+            self.ws.set_column(i, i, width)
+        if self.styled:
+            self.ws.freeze_panes(1, 0)
+        self.ws.write_row(0, 0, header, self.header_format)
+        self.rows = 0
+
+    def write_rows(self, rows):
+        write_row = self.ws.write_row
+        # constant_memory exige escribir en orden de fila
+        for offset, row in enumerate(rows, self.rows + 1):
+            write_row(offset, 0, row)
+        self.rows += len(rows)
+
+    def add_sheet(self, name, header, rows):
+        ws = self.wb.add_worksheet(name)
+        ws.write_row(0, 0, header, self.header_format)
+        for r, row in enumerate(rows, 1):
+            for c, value in enumerate(row):
+                if isinstance(value, SpillFormula):
+                    ws.write_dynamic_array_formula(r, c, r + value.rows - 1, c, '=' + value.text)
+                else:
+                    ws.write(r, c, value)
+
+    def close(self):
+        self.wb.close()
+
+def _sheet_name(number):
+    return 'Datos' if number == 1 else f'Datos_{number}'
+
+class SpillFormula:
+    """Fórmula de matriz (p. ej. UNIQUE) que ocupa `rows` celdas hacia abajo"""
+    def __init__(self, text, rows):
+        self.text = text
+        self.rows = max(rows, 1)
+
+def write_excel_chunks(chunks, output_path, backend='openpyxl', styled=True, max_rows=EXCEL_MAX_ROWS - 1,
+                       extra_sheets=None):
+    """Escribe bloques de DataFrame en streaming sin construir el libro en memoria.
+
+    Usa el libro write-only de openpyxl o, con backend='xlsxwriter', su modo
+    constant_memory. Al llegar al límite de filas de Excel continúa en una hoja
+    nueva (Datos_2, Datos_3, ...). extra_sheets es una lista de
+    (nombre, encabezado, filas) que se escriben después de los datos.
+    Devuelve el número de hojas de datos escritas.
+    """
+    sink = _XlsxWriterSink(output_path, styled) if backend == 'xlsxwriter' else _OpenpyxlSink(output_path, styled)
+    header = widths = None
+    for chunk in chunks:
+        if header is None:
+            header = [str(c) for c in chunk.columns]
+            widths = _column_widths(chunk) if styled else []
+            sink.new_sheet(header, widths)
+        rows = chunk.astype(object).where(chunk.notna(), None).to_numpy().tolist()
+        pos = 0
+        while pos < len(rows):
+            room = max_rows - sink.rows
+            if room <= 0:
+                sink.new_sheet(header, widths)
+                continue
+            sink.write_rows(rows[pos:pos + room])
+            pos += room
+    if header is None:
+        sink.new_sheet([], [])
+    for name, extra_header, rows in extra_sheets or ():
+        sink.add_sheet(name, extra_header, rows)
+    sink.close()
+    return sink.sheets
+
+class HyperLogLog:
+    """Estimador de cardinalidad con 2^p registros (error típico ≈ 1.04/√m)"""
+    def __init__(self, precision=14):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        q = 64 - self.p
+        idx = (hashes >> np.uint64(q)).astype(np.int64)
+        rest = hashes & np.uint64((1 << q) - 1)
+        # Posición del primer bit en 1 dentro de los q bits restantes
+        rank = (q + 1 - np.searchsorted(_powers_of_two(), rest, side='right')).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+@lru_cache(maxsize=None)
+def _powers_of_two():
+    return np.array([1 << i for i in range(64)], dtype=np.uint64)
+
+class TDigest:
+    """t-digest con fusión vectorizada por lotes para cuantiles aproximados"""
+    def __init__(self, delta=200):
+        self.delta = delta
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype='float64')
+        if len(values) == 0:
+            return
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype='float64')
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        # Función de escala k1: centroides pequeños en las colas, grandes en el centro
+        k = self.delta / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bucket = np.floor(k - k[0]).astype(np.int64)
+        total = np.bincount(bucket, weights=weights)
+        sums = np.bincount(bucket, weights=means * weights)
+        used = total > 0
+        self.weights = total[used]
+        self.means = sums[used] / total[used]
+
+    def quantile(self, q):
+        if len(self.means) == 0:
+            return None
+        cumulative = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * self.weights.sum(), cumulative, self.means))
+
+class ColumnProfile:
+    def __init__(self, name, dtype, profiler):
+        self.name = name
+        self.dtype = str(dtype)
+        self.profiler = profiler
+        self.rows = 0
+        self.nulls = 0
+        self.counts = pd.Series(dtype='int64')
+        self.exact = True
+        self.hll = HyperLogLog(profiler.hll_precision)
+        self.values = []
+        self.n_values = 0
+        self.digest = None
+        self.moments = {}
+        self.min = None
+        self.max = None
+
+    def update(self, series):
+        self.rows += len(series)
+        non_null = series.dropna()
+        self.nulls += len(series) - len(non_null)
+        if non_null.empty:
+            return
+        self.hll.add_hashes(_stable_hash(non_null))
+        counts = non_null.value_counts(sort=False)
+        counts.index = counts.index.astype(object)
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+        if len(self.counts) > self.profiler.max_exact_distinct:
+            # Demasiados valores distintos: se conserva solo el top y el conteo pasa a HLL
+            self.exact = False
+        if not self.exact:
+            self.counts = self.counts.nlargest(self.profiler.top_capacity)
+
+        kind = non_null.dtype.kind
+        if kind in ('i', 'u', 'f', 'b'):
+            numbers = non_null.to_numpy(dtype='float64')
+            _merge_moments(self.moments, 'v', pd.Series(numbers))
+            self._add_numbers(numbers)
+            low, high = non_null.min(), non_null.max()
+        elif kind == 'M':
+            low, high = non_null.min(), non_null.max()
+        else:
+            return
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def _add_numbers(self, numbers):
+        if self.digest is not None:
+            self.digest.update(numbers)
+            return
+        self.values.append(numbers)
+        self.n_values += len(numbers)
+        if self.n_values > self.profiler.exact_limit:
+            self.digest = TDigest(self.profiler.tdigest_delta)
+            self.digest.update(np.concatenate(self.values))
+            self.values = []
+
+    def report(self):
+        non_null = self.rows - self.nulls
+        distinct = len(self.counts) if self.exact else self.hll.count()
+        distinct = min(distinct, non_null)
+        top = self.counts.nlargest(self.profiler.top_k)
+        top = top[top > 1]
+        result = {
+            'tipo': self.dtype,
+            'filas': self.rows,
+            'nulos': self.nulls,
+            'distintos': distinct,
+            'distintos_aproximado': not self.exact,
+            'duplicados': non_null - distinct,
+            'min': _json_value(self.min),
+            'max': _json_value(self.max),
+            'top': [[_json_value(value), int(count)] for value, count in top.items()],
+        }
+        if self.moments:
+            stats = self.moments['v']
+            result['media'] = _json_value(stats['mean'])
+            result['std'] = _json_value(np.sqrt(stats['m2'] / (stats['count'] - 1)) if stats['count'] > 1 else None)
+            if self.digest is not None:
+                result['cuantiles'] = {str(q): _json_value(self.digest.quantile(q)) for q in self.profiler.quantiles}
+                result['cuantiles_aproximado'] = True
+            else:
+                values = np.concatenate(self.values)
+                result['cuantiles'] = {str(q): _json_value(v) for q, v in zip(self.profiler.quantiles, np.quantile(values, self.profiler.quantiles))}
+                result['cuantiles_aproximado'] = False
+        return result
+
+class DataProfiler:
+    """Perfil de todas las columnas en una sola pasada (por bloques o sobre el DataFrame completo).
+
+    Conteos y cuantiles son exactos mientras quepan en los límites configurados;
+    por encima se usan HyperLogLog y t-digest.
+    """
+    def __init__(self, exact_limit=200000, max_exact_distinct=100000, top_k=5, top_capacity=1000,
+                 quantiles=(0.25, 0.5, 0.75), hll_precision=14, tdigest_delta=200):
+        self.exact_limit = exact_limit
+        self.max_exact_distinct = max_exact_distinct
+        self.top_k = top_k
+        self.top_capacity = top_capacity
+        self.quantiles = quantiles
+        self.hll_precision = hll_precision
+        self.tdigest_delta = tdigest_delta
+        self.columns = {}
+
+    def update(self, chunk):
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnProfile(col, chunk[col].dtype, self)
+            self.columns[col].update(chunk[col])
+
+    def profile(self, chunks):
+        for chunk in chunks:
+            self.update(chunk)
+        return self.report()
+
+    def report(self):
+        return {str(col): profile.report() for col, profile in self.columns.items()}
+
+def _stable_hash(series):
+    # Mismo hash para el mismo valor aunque cada bloque tenga un dtype numérico distinto
+    kind = series.dtype.kind
+    if kind in ('i', 'u'):
+        series = series.astype('int64')
+    elif kind == 'f':
+        series = series.astype('float64')
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+def _json_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return None if np.isnan(value) else round(value, 6)
+    if isinstance(value, (int, str, bool)):
+        return value
+    return str(value)
+
+def run_profile(cli, output_path=None):
+    """Genera el perfil de los datos cargados y lo guarda como JSON comparable entre corridas"""
+    profiler = DataProfiler()
+    columns = profiler.profile(cli.chunks())
+    report = {
+        'archivo': str(cli.current_file),
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'columnas': columns,
+    }
+    if output_path is None:
+        stem = Path(str(cli.current_file)).stem
+        output_path = cli.output_dir / f"perfil_{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+    print_profile(report)
+    print(f"\n✓ Perfil guardado: {output_path}")
+    return report, output_path
+
+def print_profile(report):
+    print(f"\n=== Perfil: {report['archivo']} ===")
+    for col, p in report['columnas'].items():
+        approx = "~" if p['distintos_aproximado'] else ""
+        print(f"\n{col} ({p['tipo']})")
+        print(f"  Nulos: {p['nulos']} | Distintos: {approx}{p['distintos']} | Duplicados: {approx}{p['duplicados']}")
+        if p['min'] is not None:
+            print(f"  Rango: {p['min']} a {p['max']}")
+        if 'cuantiles' in p:
+            approx = "~" if p['cuantiles_aproximado'] else ""
+            quantiles = ", ".join(f"p{int(float(q) * 100)}={approx}{v}" for q, v in p['cuantiles'].items())
+            print(f"  Media: {p['media']} | Std: {p['std']} | {quantiles}")
+        if p['top']:
+            print("  Top: " + ", ".join(f"{value} ({count})" for value, count in p['top']))
+
+def diff_profiles(old, new):
+    """Muestra las métricas que cambiaron entre dos perfiles"""
+    old_cols, new_cols = old['columnas'], new['columnas']
+    changes = 0
+    for col in sorted(set(old_cols) - set(new_cols)):
+        print(f"- Columna eliminada: {col}")
+        changes += 1
+    for col in sorted(set(new_cols) - set(old_cols)):
+        print(f"+ Columna nueva: {col}")
+        changes += 1
+    for col in [c for c in new_cols if c in old_cols]:
+        for metric in sorted(set(old_cols[col]) | set(new_cols[col])):
+            before, after = old_cols[col].get(metric), new_cols[col].get(metric)
+            if before != after:
+                print(f"~ {col}.{metric}: {before} → {after}")
+                changes += 1
+    if not changes:
+        print("Sin diferencias entre los perfiles")
+    return changes
+
+_PHONE_HINTS = ('tel', 'phone', 'cel', 'movil', 'móvil', 'whatsapp')
+
+def _canonical_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%S')
+    return str(value)
+
+def canonical_text(series):
+    """Texto de una columna que no depende del dtype con que se leyó.
+
+    Un entero en una columna con blancos llega como float64 y astype('string')
+    daría "5512345678.0"; aquí los flotantes enteros se escriben sin decimales
+    y las fechas en ISO, así el mismo valor da el mismo texto en cualquier archivo.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime('%Y-%m-%dT%H:%M:%S').astype('string')
+    if pd.api.types.is_float_dtype(series):
+        values = series.astype('float64')
+        integral = np.isfinite(values) & (values == np.floor(values)) & (values.abs() < 2 ** 63)
+        text = values.astype('string')
+        text[integral] = values[integral].astype('int64').astype('string')
+        return text
+    if series.dtype.kind in ('i', 'u', 'b'):
+        return series.astype('string')
+    return series.astype(object).map(_canonical_value, na_action='ignore').astype('string')
+
+def _normalize_key(series, mode):
+    text = canonical_text(series).str.strip()
+    if mode == 'phone':
+        # Solo dígitos y los últimos 10: ignora lada internacional y formato
+        text = text.str.replace(r'\D', '', regex=True).str[-10:]
+    elif mode in ('email', 'text'):
+        text = text.str.lower()
+    return text.replace('', pd.NA)
+
+def _key_mode(column, mode=None):
+    if mode:
+        return mode
+    name = str(column).lower()
+    if 'mail' in name:
+        return 'email'
+    if any(hint in name for hint in _PHONE_HINTS):
+        return 'phone'
+    return 'text'
+
+def parse_key_spec(spec):
+    """'Email, Telefono:phone' → [('Email', 'email'), ('Telefono', 'phone')]"""
+    keys = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        column, _, mode = part.partition(':')
+        keys.append((column.strip(), _key_mode(column.strip(), mode.strip() or None)))
+    return keys
+
+def expand_paths(text):
+    """Rutas separadas por coma (o una lista); cada una puede ser un patrón glob o un directorio"""
+    paths = []
+    parts = text.split(',') if isinstance(text, str) else [str(part) for part in text]
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        path = Path(part)
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in ('.xlsx', '.xlsm')))
+        elif any(ch in part for ch in '*?['):
+            paths.extend(Path(p) for p in sorted(glob.glob(part)))
+        else:
+            paths.append(path)
+    return paths
+
+class DedupIndex:
+    """Índice persistente de claves compuestas para detectar duplicados entre archivos.
+
+    Cada clave normalizada se guarda bajo su hash de 64 bits junto con su primera
+    aparición (archivo, fila). Si dos claves distintas comparten hash se comparan
+    completas, así que una colisión nunca se reporta como duplicado. La memoria
+    crece con las claves distintas, no con las filas procesadas.
+    """
+    def __init__(self, path, keys=None):
+        self.path = Path(path)
+        self.keys = keys
+        self.entries = {}
+        self.collisions = {}
+        self.sources = []
+        # Fuente que cambió desde la última corrida: obliga a reconstruir el índice
+        self.stale_source = None
+        if self.path.exists():
+            self.load()
+            if keys and [k[0] for k in keys] != [k[0] for k in self.keys]:
+                raise ValueError(f"El índice usa las columnas {[k[0] for k in self.keys]}")
+        elif not keys:
+            raise ValueError("Un índice nuevo necesita columnas clave")
+
+    def load(self):
+        with open(self.path, 'rb') as f:
+            data = pickle.load(f)
+        self.keys = data['keys']
+        self.entries = data['entries']
+        self.collisions = data['collisions']
+        self.sources = data['sources']
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump({
+                'keys': self.keys,
+                'entries': self.entries,
+                'collisions': self.collisions,
+                'sources': self.sources,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def register_source(self, filepath):
+        """Registra el archivo; devuelve None si ya está indexado sin cambios"""
+        path = Path(filepath).resolve()
+        stat = path.stat()
+        for i, source in enumerate(self.sources):
+            if source['path'] != str(path):
+                continue
+            if source['mtime'] == stat.st_mtime_ns and source['size'] == stat.st_size:
+                return None
+            source.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+            self.stale_source = i
+            return i
+        self.sources.append({'path': str(path), 'mtime': stat.st_mtime_ns, 'size': stat.st_size})
+        return len(self.sources) - 1
+
+    def rebuild(self, read_chunks, skip):
+        """Vuelve a indexar las demás fuentes, en orden de registro, sin la fuente `skip`.
+
+        Quitar solo las claves del archivo que cambió no basta: las filas de otros
+        archivos que eran duplicados de esas claves nunca se guardaron en el índice.
+        """
+        self.entries = {}
+        self.collisions = {}
+        for source_id, source in enumerate(self.sources):
+            if source_id == skip or not Path(source['path']).exists():
+                continue
+            for chunk in read_chunks(source['path']):
+                for _ in self.scan_chunk(chunk, source_id):
+                    pass
+        self.stale_source = None
+
+    def key_frame(self, chunk):
+        missing = [column for column, _ in self.keys if column not in chunk.columns]
+        if missing:
+            raise KeyError(f"Columnas clave no encontradas: {', '.join(map(str, missing))}")
+        return pd.DataFrame({column: _normalize_key(chunk[column], mode) for column, mode in self.keys})
+
+    def scan_chunk(self, chunk, source_id):
+        """Agrega el bloque al índice y genera (clave, fila, fuente_original, fila_original)"""
+        keys = self.key_frame(chunk)
+        keys = keys[keys.notna().any(axis=1)]
+        if keys.empty:
+            return
+        hashes = pd.util.hash_pandas_object(keys.fillna(''), index=False).to_numpy()
+        rows = keys.index.to_numpy() + 2  # Fila de Excel: encabezado en la fila 1
+        entries = self.entries
+        for h, key, row in zip(hashes.tolist(), keys.itertuples(index=False, name=None), rows.tolist()):
+            key = tuple(None if pd.isna(v) else v for v in key)
+            entry = entries.get(h)
+            if entry is None:
+                entries[h] = (key, source_id, row)
+            elif entry[0] == key:
+                yield key, row, entry[1], entry[2]
+            else:
+                match = next((e for e in self.collisions.get(h, []) if e[0] == key), None)
+                if match:
+                    yield key, row, match[1], match[2]
+                else:
+                    self.collisions.setdefault(h, []).append((key, source_id, row))
+
+def run_dedup(cli, files, keys, index_name='leads', report_path=None):
+    """Escanea los archivos contra el índice persistente y escribe los duplicados a CSV"""
+    index = DedupIndex(cli.output_dir / 'dedup' / f"{index_name}.pkl", keys)
+    if report_path is None:
+        report_path = cli.output_dir / f"duplicados_{index_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    summary = {'archivos': 0, 'omitidos': 0, 'filas': 0, 'duplicados': 0}
+    # Las claves se normalizan a texto: optimizar los tipos de cada bloque no aporta nada
+    read_chunks = partial(cli.iter_chunks, optimize=False)
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([column for column, _ in index.keys] + ['archivo', 'fila', 'archivo_original', 'fila_original'])
+        for filepath in files:
+            source_id = index.register_source(filepath)
+            if source_id is None:
+                print(f"• {filepath}: ya indexado, sin cambios")
+                summary['omitidos'] += 1
+                continue
+            if index.stale_source is not None:
+                print(f"↻ {filepath} cambió: reconstruyendo el índice")
+                index.rebuild(read_chunks, skip=source_id)
+            found = 0
+            for chunk in read_chunks(filepath):
+                summary['filas'] += len(chunk)
+                for key, row, first_source, first_row in index.scan_chunk(chunk, source_id):
+                    writer.writerow(list(key) + [index.sources[source_id]['path'], row,
+                                                 index.sources[first_source]['path'], first_row])
+                    found += 1
+            summary['archivos'] += 1
+            summary['duplicados'] += found
+            print(f"✓ {filepath}: {found} duplicados")
+    index.save()
+    summary['claves'] = len(index.entries) + sum(len(v) for v in index.collisions.values())
+    print(f"\nFilas procesadas: {summary['filas']} | Duplicados: {summary['duplicados']} | Claves en índice: {summary['claves']}")
+    print(f"✓ Reporte de duplicados: {report_path}")
+    return summary
+
+class CumulativeStore:
+    """Histórico acumulado en SQLite: se agregan solo las filas nuevas.
+
+    Cada fila lleva una clave (columnas clave normalizadas o, sin ellas, un hash
+    de 128 bits de la fila completa) con índice único, así que volver a cargar
+    el mismo día no duplica registros. Las columnas nuevas se agregan al vuelo.
+    """
+    def __init__(self, path, keys=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (nombre TEXT PRIMARY KEY, valor TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS columnas (posicion INTEGER PRIMARY KEY, nombre TEXT UNIQUE, tipo TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS registros (_clave TEXT PRIMARY KEY)")
+        stored = self.conn.execute("SELECT valor FROM meta WHERE nombre = 'claves'").fetchone()
+        if stored:
+            self.keys = [tuple(k) for k in json.loads(stored[0])]
+        else:
+            self.keys = keys or []
+            with self.conn:
+                self.conn.execute("INSERT INTO meta VALUES ('claves', ?)", (json.dumps(self.keys),))
+        self.columns = {name: kind for name, kind in
+                        self.conn.execute("SELECT nombre, tipo FROM columnas ORDER BY posicion")}
+
+    def close(self):
+        self.conn.close()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+
+    def _row_keys(self, chunk):
+        if not self.keys:
+            return self._row_hashes(chunk)
+        parts = [_normalize_key(chunk[column], mode) for column, mode in self.keys]
+        blank = pd.concat(parts, axis=1).isna().all(axis=1)
+        parts = [part.fillna('') for part in parts]
+        keys = parts[0].str.cat(parts[1:], sep='\x1f') if len(parts) > 1 else parts[0]
+        if blank.any():
+            # Sin ninguna clave no hay con qué comparar: esas filas solo se
+            # descartan si son idénticas completas, no se colapsan en una sola
+            keys = keys.astype(object)
+            keys[blank] = '#' + self._row_hashes(chunk[blank])
+        return keys
+
+    @staticmethod
+    def _row_hashes(chunk):
+        # Texto canónico: el mismo valor leído como 100 o 100.0 da el mismo hash
+        frame = pd.DataFrame({col: canonical_text(chunk[col]).fillna('') for col in chunk.columns},
+                             index=chunk.index)
+        low = pd.util.hash_pandas_object(frame, index=False)
+        high = pd.util.hash_pandas_object(frame, index=False, hash_key='acumulado-fila-2')
+        return pd.Series([f"{a:016x}{b:016x}" for a, b in zip(low, high)], index=chunk.index, dtype=object)
+
+    def _ensure_columns(self, chunk):
+        for col in chunk.columns:
+            name = str(col)
+            if name in self.columns:
+                continue
+            kind = 'fecha' if chunk[col].dtype.kind == 'M' else 'valor'
+            self.conn.execute(f"ALTER TABLE registros ADD COLUMN {_quote_identifier(name)}")
+            self.conn.execute("INSERT INTO columnas (nombre, tipo) VALUES (?, ?)", (name, kind))
+            self.columns[name] = kind
+
+    def append(self, chunk):
+        """Inserta las filas cuya clave no existe; devuelve cuántas se agregaron"""
+        chunk = chunk.copy()
+        chunk.columns = [str(c) for c in chunk.columns]
+        keys = self._row_keys(chunk)
+        with self.conn:
+            self._ensure_columns(chunk)
+        for col in chunk.columns:
+            if chunk[col].dtype.kind == 'M':
+                chunk[col] = chunk[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+        values = chunk.astype(object).where(chunk.notna(), None)
+        columns = ['_clave'] + list(chunk.columns)
+        sql = (f"INSERT OR IGNORE INTO registros ({', '.join(map(_quote_identifier, columns))}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(sql, zip(keys.tolist(), *(values[col].tolist() for col in chunk.columns)))
+            return self.conn.total_changes - before
+
+    def iter_frames(self, chunk_size=50000):
+        names = list(self.columns)
+        if not names:
+            return
+        query = f"SELECT {', '.join(map(_quote_identifier, names))} FROM registros ORDER BY rowid"
+        for frame in pd.read_sql_query(query, self.conn, chunksize=chunk_size):
+            for name, kind in self.columns.items():
+                if kind == 'fecha':
+                    frame[name] = pd.to_datetime(frame[name], errors='coerce')
+            yield frame
+
+def _quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def run_incremental_report(cli, store_name, current_path, keys=None, past_path=None, output_path=None):
+    """Agrega los datos del día al acumulado y genera el Excel a partir del histórico"""
+    store = CumulativeStore(cli.output_dir / 'acumulado' / f"{store_name}.sqlite", keys)
+    try:
+        summary = {'nuevas': 0, 'leidas': 0}
+        sources = [current_path]
+        if past_path and store.count() == 0:
+            sources.insert(0, past_path)
+        for source in sources:
+            for chunk in cli.iter_chunks(source):
+                summary['leidas'] += len(chunk)
+                summary['nuevas'] += store.append(chunk)
+            print(f"✓ {source} incorporado")
+        summary['total'] = store.count()
+        print(f"Filas leídas: {summary['leidas']} | Nuevas: {summary['nuevas']} | Total acumulado: {summary['total']}")
+        if output_path is None:
+            output_path = cli.output_dir / f"reporte_acumulativo_{datetime.now().strftime('%Y%m%d')}.xlsx"
+        write_excel_chunks(store.iter_frames(cli.chunk_size), output_path, cli.excel_backend)
+        print(f"✓ Reporte generado: {output_path}")
+        summary['reporte'] = str(output_path)
+        return summary
+    finally:
+        store.close()
+
+def _parse_workbook_worker(position, filepath, tmp_dir):
+    """Se ejecuta en un proceso del pool: parsea el libro y lo deja en disco"""
+    df = pd.read_excel(filepath)
+    df.columns = [str(c) for c in df.columns]
+    tmp_file = Path(tmp_dir) / f"{position}.pkl"
+    df.to_pickle(tmp_file)
+    return {
+        'rows': len(df),
+        'columns': list(df.columns),
+        'kinds': {col: df[col].dtype.kind for col in df.columns},
+        'tmp': str(tmp_file),
+    }
+
+def _reconcile_dtype(kinds, complete):
+    """Tipo común para una columna según los tipos vistos en cada archivo"""
+    kinds = set(kinds)
+    if kinds == {'b'}:
+        return 'boolean'
+    if kinds <= {'i', 'u'}:
+        # Si falta en algún archivo habrá nulos: entero con soporte de NA
+        return 'int64' if complete else 'Int64'
+    if kinds <= {'i', 'u', 'f'}:
+        return 'float64'
+    if kinds == {'M'}:
+        return 'datetime64[ns]'
+    return 'object'
+
+def combine_reports(cli, files, output_path=None, workers=None):
+    """Combina muchos libros en paralelo alineando columnas y tipos"""
+    files = [Path(f) for f in files]
+    if not files:
+        print("No se encontraron archivos para combinar")
+        return None
+    if output_path is None:
+        output_path = cli.output_dir / f"reporte_combinado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    output_path = Path(output_path)
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    errors = []
+
+    with tempfile.TemporaryDirectory(dir=cli.output_dir) as tmp_dir:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_parse_workbook_worker, i, str(f), tmp_dir): i for i, f in enumerate(files)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # Un archivo dañado no detiene el lote
+                    errors.append((str(files[i]), str(e)))
+                print(f"\r[{done}/{len(files)}] archivos procesados, {len(errors)} con error", end='', flush=True)
+        print()
+
+        order = sorted(results)
+        columns = []
+        seen_kinds = {}
+        for i in order:
+            for col in results[i]['columns']:
+                if col not in seen_kinds:
+                    columns.append(col)
+                    seen_kinds[col] = []
+                seen_kinds[col].append(results[i]['kinds'][col])
+        dtypes = {col: _reconcile_dtype(kinds, len(kinds) == len(order)) for col, kinds in seen_kinds.items()}
+
+        def aligned_frames():
+            for i in order:
+                df = pd.read_pickle(results[i]['tmp']).reindex(columns=columns)
+                for col, dtype in dtypes.items():
+                    try:
+                        df[col] = df[col].astype(dtype)
+                    except (TypeError, ValueError):
+                        df[col] = df[col].astype('object')
+                df['_archivo'] = files[i].name
+                os.remove(results[i]['tmp'])
+                yield df
+
+        if order:
+            if output_path.suffix.lower() == '.csv':
+                for n, df in enumerate(aligned_frames()):
+                    df.to_csv(output_path, index=False, mode='w' if n == 0 else 'a', header=n == 0)
+            else:
+                write_excel_chunks(aligned_frames(), output_path, cli.excel_backend)
+
+    total_rows = sum(results[i]['rows'] for i in order)
+    print(f"✓ {len(order)} archivos combinados ({total_rows} filas, {len(columns)} columnas)")
+    if order:
+        print(f"✓ Reporte combinado: {output_path}")
+    summary = {'archivos': len(order), 'filas': total_rows, 'errores': len(errors), 'salida': str(output_path) if order else None}
+    if errors:
+        error_path = cli.output_dir / f"combinar_errores_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        with open(error_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['archivo', 'error'])
+            writer.writerows(errors)
+        print(f"⚠ {len(errors)} archivos con error, detalle en: {error_path}")
+        summary['reporte_errores'] = str(error_path)
+    return summary
+
+FORMULA_KINDS = ('duplicados', 'unicos', 'estado', 'fechas')
+
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+def _excel_value(value):
+    # (rango, valor) en el orden de Excel: números y fechas, texto, lógicos, vacíos
+    if pd.isna(value):
+        return (3, '')
+    if isinstance(value, (bool, np.bool_)):
+        return (2, bool(value))
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return (0, float(value))
+    if isinstance(value, datetime):
+        return (0, (value.replace(tzinfo=None) - _EXCEL_EPOCH).total_seconds() / 86400)
+    return (1, str(value).casefold())
+
+def _excel_key(series):
+    """Valores como los compara y ordena Excel: el texto no distingue mayúsculas,
+    pero 10 y "10" (o VERDADERO y 1) son valores distintos"""
+    return series.astype(object).map(_excel_value)
+
+def _split_rows(name, header, rows):
+    """Parte una hoja auxiliar en name, name_2, ... al llegar al límite de filas"""
+    limit = EXCEL_MAX_ROWS - 1
+    return [(name if i == 0 else f"{name}_{i // limit + 1}", header, rows[i:i + limit])
+            for i in range(0, max(len(rows), 1), limit)]
+
+def _free_column(df, name):
+    while name in df.columns:
+        name = f"{name}_"
+    return name
+
+def build_formula_sheets(df, kind, column, static=False, reference=None, year=None):
+    """Datos y hojas auxiliares para escribir una fórmula en todo el libro.
+
+    Evita los rangos crecientes (COUNTIF($A$2:$A2, A2)) y el MATCH(0, COUNTIF(...))
+    matricial, que son cuadráticos, y usa rangos del tamaño exacto de los datos:
+    duplicados y estado ordenan las filas por la clave (la columna _fila guarda
+    el orden original) y cada fila solo se compara con la anterior; únicos es
+    una sola fórmula UNIQUE; estado busca en una hoja auxiliar sin duplicados con
+    XMATCH exacto, y con búsqueda binaria solo si los existentes son todos números
+    o fechas: el orden del texto en Excel (acentos, guiones) no es el de Python.
+    Con static=True se escriben los valores ya calculados.
+    Devuelve (DataFrame de la hoja Datos, [(hoja, encabezado, filas)]).
+    """
+    if kind not in FORMULA_KINDS:
+        raise ValueError(f"Fórmula desconocida: {kind}. Disponibles: {', '.join(FORMULA_KINDS)}")
+    if column not in df.columns:
+        raise ValueError(f"La columna '{column}' no existe")
+    n = len(df)
+    if not static and n > EXCEL_MAX_ROWS - 1:
+        raise ValueError(f"{n} filas no caben en una sola hoja; usa valores precalculados")
+    from openpyxl.utils import get_column_letter
+    key = _excel_key(df[column])
+
+    if kind == 'unicos':
+        first = ~key.duplicated()
+        if static:
+            values = df[column][first].astype(object)
+            rows = [[value] for value in values.where(values.notna(), None)]
+            return df, _split_rows('Únicos', [str(column)], rows)
+        letter = get_column_letter(df.columns.get_loc(column) + 1)
+        rows = [[SpillFormula(f"_xlfn.UNIQUE(Datos!${letter}$2:${letter}${n + 1})", int(first.sum()))]]
+        return df, [('Únicos', [str(column)], rows)]
+
+    if kind == 'fechas':
+        year = int(year or datetime.now().year)
+        name = _free_column(df, f"Año {year}")
+        if static:
+            dates = pd.to_datetime(df[column], errors='coerce')
+            inside = (dates >= pd.Timestamp(year, 1, 1)) & (dates <= pd.Timestamp(year, 12, 31))
+            return df.assign(**{name: np.where(inside, str(year), 'Otro Año')}), []
+        if not pd.api.types.is_datetime64_any_dtype(df[column]):
+            raise ValueError(f"La columna '{column}' no tiene fechas de Excel; usa valores precalculados")
+        c = get_column_letter(df.columns.get_loc(column) + 1)
+        formulas = [f'=IF(AND({c}{r}>=DATE({year},1,1),{c}{r}<=DATE({year},12,31)),"{year}","Otro Año")'
+                    for r in range(2, n + 2)]
+        return df.assign(**{name: formulas}), []
+
+    extra = []
+    if kind == 'estado':
+        if reference not in df.columns:
+            raise ValueError(f"La columna de existentes '{reference}' no existe")
+        existing = df[reference].dropna()
+        existing_keys = _excel_key(existing)
+        keep = ~existing_keys.duplicated()
+        existing, existing_keys = existing[keep].astype(object), existing_keys[keep]
+        numeric = all(rank == 0 for rank, _ in existing_keys)
+        if numeric:
+            # Números y fechas se ordenan igual en Python y en Excel
+            existing = existing.iloc[np.argsort(existing_keys.to_numpy(), kind='stable')]
+        extra.extend(_split_rows('_existentes', [str(reference)], [[value] for value in existing]))
+    name = _free_column(df, 'Duplicado' if kind == 'duplicados' else 'Estado')
+
+    if static:
+        duplicated = key.duplicated()
+        if kind == 'duplicados':
+            values = np.where(duplicated, 'Duplicado', 'Único')
+        else:
+            blank = df[column].isna()
+            known = set(existing_keys)
+            values = np.select([blank, duplicated, key.map(lambda v: v in known).astype(bool)],
+                               ['', 'Duplicado', 'Existente'], 'Nuevo')
+        return df.assign(**{name: values}), extra
+
+    # Orden estable por clave: las repeticiones quedan juntas y la primera
+    # aparición conserva su lugar relativo
+    order = np.argsort(key.to_numpy(), kind='stable')
+    data = df.iloc[order].reset_index(drop=True)
+    data[_free_column(data, '_fila')] = order + 2
+    k = get_column_letter(data.columns.get_loc(column) + 1)
+    if kind == 'duplicados':
+        formulas = ['Único'] + [f'=IF({k}{r}={k}{r - 1},"Duplicado","Único")' for r in range(3, n + 2)]
+    else:
+        lookup = f"_existentes!$A$2:$A${max(len(existing), 1) + 1}"
+        # XMATCH coincidencia exacta (sin comodines); modo 2 = búsqueda binaria ascendente
+        search = ',0,2' if numeric else ',0'
+        formulas = [
+            f'=IF(ISBLANK({k}{r}),"",' + (f'IF({k}{r}={k}{r - 1},"Duplicado",' if r > 2 else '')
+            + f'IF(ISNUMBER(_xlfn.XMATCH({k}{r},{lookup}{search})),"Existente","Nuevo"))'
+            + (')' if r > 2 else '')
+            for r in range(2, n + 2)
+        ]
+    data[name] = formulas[:n]
+    return data, extra
+
+def write_formulas(cli, kind, column, static=False, reference=None, year=None, output_path=None, backend=None):
+    """Escribe la hoja cargada con la columna de fórmulas (o valores) en un archivo nuevo.
+
+    Se parte de los datos tal como se leyeron, sin la optimización de tipos, para
+    no convertir texto en fechas ni decimales en enteros. Solo se escribe la hoja
+    de datos: las demás hojas y el formato del libro original no se copian.
+    """
+    if cli.df is None:
+        raise ValueError("Carga el archivo completo (sin modo streaming) para escribir fórmulas")
+    start = time.perf_counter()
+    if not static and kind in ('duplicados', 'estado'):
+        print(f"⚠ Las filas se escriben ordenadas por '{column}'; la columna _fila guarda su posición original")
+    data, extra = build_formula_sheets(cli.raw_frame(), kind, column, static, reference, year)
+    output_path = output_path or cli.output_dir / f"formulas_{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    write_excel_chunks(frame_chunks(data, cli.chunk_size), output_path, backend or cli.excel_backend, extra_sheets=extra)
+    print(f"✓ {'Valores' if static else 'Fórmulas'} de {kind} para {len(data)} filas en {time.perf_counter() - start:.1f}s")
+    print(f"✓ Libro guardado: {output_path} (solo la hoja de datos, sin otras hojas ni formato)")
+    if not static and kind in ('duplicados', 'estado'):
+        print("💡 Ordena el libro por _fila para volver al orden original")
+    return output_path
+
+class SqlColumn:
+    """Estadísticas de una columna para elegir su tipo SQL"""
+    def __init__(self, name):
+        self.name = str(name)
+        self.kinds = set()
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.max_length = 0
+        self.has_time = False
+
+    def update(self, series):
+        non_null = series.dropna()
+        if non_null.dtype.kind == 'f':
+            # inf/-inf se exportan como NULL
+            non_null = non_null[np.isfinite(non_null)]
+        self.nulls += len(series) - len(non_null)
+        if non_null.empty:
+            return
+        kind = non_null.dtype.kind
+        self.kinds.add(kind if kind in ('b', 'i', 'u', 'f', 'M') else 'O')
+        if kind in ('i', 'u', 'f'):
+            low, high = non_null.min(), non_null.max()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+        elif kind == 'M':
+            self.has_time = self.has_time or bool((non_null != non_null.dt.normalize()).any())
+        if kind not in ('b', 'M'):
+            self.max_length = max(self.max_length, int(non_null.astype(str).str.len().max()))
+
+    def sql_type(self, dialect='postgres'):
+        kinds = self.kinds
+        if not kinds:
+            return 'TEXT'
+        if dialect == 'sqlite':
+            if kinds <= {'b', 'i', 'u'}:
+                return 'INTEGER'
+            if kinds <= {'b', 'i', 'u', 'f'}:
+                return 'REAL'
+            return 'TEXT'
+        if kinds == {'b'}:
+            return 'BOOLEAN'
+        if kinds <= {'i', 'u'}:
+            if -32768 <= self.min and self.max <= 32767:
+                return 'SMALLINT'
+            if -2 ** 31 <= self.min and self.max <= 2 ** 31 - 1:
+                return 'INTEGER'
+            return 'BIGINT'
+        if kinds <= {'i', 'u', 'f'}:
+            return 'DOUBLE PRECISION'
+        if kinds == {'M'}:
+            return 'TIMESTAMP' if self.has_time else 'DATE'
+        if self.max_length > 4000:
+            return 'TEXT'
+        return f'VARCHAR({max(self.max_length, 1)})'
+
+def infer_sql_schema(chunks):
+    """Primera pasada: tipos a partir de rangos y longitudes reales"""
+    columns = {}
+    for chunk in chunks:
+        for col in chunk.columns:
+            columns.setdefault(col, SqlColumn(col)).update(chunk[col])
+    return list(columns.values())
+
+def create_table_sql(table_name, schema, dialect='postgres'):
+    lines = []
+    for column in schema:
+        null = '' if column.nulls else ' NOT NULL'
+        lines.append(f"    {_quote_identifier(column.name)} {column.sql_type(dialect)}{null}")
+    return f"CREATE TABLE {_quote_identifier(table_name)} (\n" + ",\n".join(lines) + "\n);\n"
+
+def _sql_literals(chunk, schema):
+    """Convierte cada columna del bloque a literales SQL (vectorizado por columna)"""
+    literals = []
+    for column, (_, series) in zip(schema, chunk.items()):
+        kind = series.dtype.kind
+        null = series.isna()
+        if kind == 'b':
+            text = series.map({True: 'TRUE', False: 'FALSE'})
+        elif kind in ('i', 'u'):
+            text = series.astype(str)
+        elif kind == 'f':
+            series = series.astype('float64')
+            null = null | ~np.isfinite(series)
+            text = series.map(repr)
+        elif kind == 'M':
+            fmt = '%Y-%m-%d %H:%M:%S' if column.has_time else '%Y-%m-%d'
+            text = "'" + series.dt.strftime(fmt) + "'"
+        else:
+            text = "'" + series.astype(str).str.replace("'", "''", regex=False) + "'"
+        literals.append(text.astype(object).where(~null, 'NULL').tolist())
+    return zip(*literals)
+
+def _sqlite_values(chunk):
+    values = chunk.copy()
+    for col in values.columns:
+        kind = values[col].dtype.kind
+        if kind == 'M':
+            values[col] = values[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+        elif kind not in ('b', 'i', 'u', 'f'):
+            values[col] = values[col].astype(object).where(values[col].isna(), values[col].astype(str))
+    return values.astype(object).where(values.notna(), None).itertuples(index=False, name=None)
+
+def export_sql(cli, table_name, mode='insert', batch_size=1000, sqlite_path=None):
+    """Exporta los datos a SQL en bloques.
+
+    mode: 'schema' (solo CREATE TABLE), 'insert' (INSERT multi-fila por lotes),
+    'copy' (CSV + script de carga con \\copy) o 'sqlite' (carga directa).
+    """
+    dialect = 'sqlite' if mode == 'sqlite' else 'postgres'
+    schema = infer_sql_schema(cli.chunks())
+    ddl = create_table_sql(table_name, schema, dialect)
+    columns = ', '.join(_quote_identifier(c.name) for c in schema)
+    table = _quote_identifier(table_name)
+    outputs = []
+
+    if mode == 'schema':
+        output_path = cli.output_dir / f"create_table_{table_name}.sql"
+        with open(output_path, 'w') as f:
+            f.write(ddl)
+        outputs.append(output_path)
+
+    elif mode == 'insert':
+        output_path = cli.output_dir / f"insert_{table_name}.sql"
+        rows = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(ddl + "\nBEGIN;\n")
+            for chunk in cli.chunks():
+                batch = []
+                for values in _sql_literals(chunk, schema):
+                    batch.append("(" + ", ".join(values) + ")")
+                    if len(batch) >= batch_size:
+                        f.write(f"INSERT INTO {table} ({columns}) VALUES\n" + ",\n".join(batch) + ";\n")
+                        batch = []
+                if batch:
+                    f.write(f"INSERT INTO {table} ({columns}) VALUES\n" + ",\n".join(batch) + ";\n")
+                rows += len(chunk)
+            f.write("COMMIT;\n")
+        outputs.append(output_path)
+        print(f"✓ {rows} filas en lotes de {batch_size}")
+
+    elif mode == 'copy':
+        data_path = cli.output_dir / f"{table_name}.csv"
+        for i, chunk in enumerate(cli.chunks()):
+            chunk.to_csv(data_path, index=False, mode='w' if i == 0 else 'a', header=i == 0,
+                         date_format='%Y-%m-%d %H:%M:%S')
+        loader_path = cli.output_dir / f"load_{table_name}.sql"
+        with open(loader_path, 'w', encoding='utf-8') as f:
+            f.write(ddl)
+            f.write(f"\\copy {table} ({columns}) FROM '{data_path.resolve()}' WITH (FORMAT csv, HEADER true)\n")
+        outputs.extend([data_path, loader_path])
+
+    elif mode == 'sqlite':
+        sqlite_path = Path(sqlite_path or cli.output_dir / f"{table_name}.sqlite")
+        placeholders = ', '.join('?' * len(schema))
+        conn = sqlite3.connect(sqlite_path)
+        try:
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(ddl)
+            rows = 0
+            for chunk in cli.chunks():
+                # Una transacción por bloque
+                with conn:
+                    conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", _sqlite_values(chunk))
+                rows += len(chunk)
+        finally:
+            conn.close()
+        outputs.append(sqlite_path)
+        print(f"✓ {rows} filas cargadas en SQLite")
+
+    for path in outputs:
+        print(f"✓ Archivo SQL generado: {path}")
+    return outputs
+
+PIPELINE_STAGES = ('load', 'profile', 'dedup', 'export', 'combine', 'accumulate', 'formulas')
+
+def _stage_load(cli, params, current):
+    path = params.get('path', current)
+    if path is None:
+        raise ValueError("La etapa load necesita 'path' o una entrada en 'inputs'")
+    return cli.load_file(str(path), streaming=params.get('streaming', False), chunk_size=params.get('chunk_size'))
+
+def _stage_profile(cli, params, current):
+    if not cli.has_data():
+        raise ValueError("No hay datos cargados para perfilar")
+    run_profile(cli, params.get('output'))
+    return True
+
+def _stage_dedup(cli, params, current):
+    files = expand_paths(params['files']) if 'files' in params else [Path(current or cli.current_file)]
+    keys = parse_key_spec(params['keys']) if params.get('keys') else None
+    run_dedup(cli, files, keys, params.get('index', 'leads'), params.get('output'))
+    return True
+
+def _stage_export(cli, params, current):
+    if not cli.has_data():
+        raise ValueError("No hay datos cargados para exportar")
+    fmt = params.get('format', 'excel')
+    if fmt == 'excel':
+        export_excel(cli, params.get('output'), params.get('backend'))
+    elif fmt == 'csv':
+        export_csv(cli, params.get('output'))
+    elif fmt == 'sql':
+        table = params.get('table') or Path(str(cli.current_file)).stem
+        export_sql(cli, table, params.get('mode', 'insert'), params.get('batch_size', 1000), params.get('sqlite_path'))
+    else:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+    return True
+
+def _stage_formulas(cli, params, current):
+    write_formulas(cli, params['kind'], params['column'], params.get('static', False), params.get('reference'),
+                   params.get('year'), params.get('output'), params.get('backend'))
+    return True
+
+def _stage_combine(cli, params, current):
+    files = expand_paths(params['files'])
+    summary = combine_reports(cli, files, params.get('output'), params.get('workers'))
+    return bool(summary) and (summary['errores'] == 0 or params.get('allow_errors', False))
+
+def _stage_accumulate(cli, params, current):
+    path = params.get('path', current)
+    if path is None:
+        raise ValueError("La etapa accumulate necesita 'path' o una entrada en 'inputs'")
+    keys = parse_key_spec(params['keys']) if params.get('keys') else None
+    run_incremental_report(cli, params.get('store', 'reporte'), str(path), keys,
+                           params.get('past'), params.get('output'))
+    return True
+
+_STAGE_RUNNERS = {
+    'load': _stage_load,
+    'profile': _stage_profile,
+    'dedup': _stage_dedup,
+    'export': _stage_export,
+    'combine': _stage_combine,
+    'accumulate': _stage_accumulate,
+    'formulas': _stage_formulas,
+}
+
+def load_pipeline(path):
+    """Lee un pipeline YAML o JSON: {'inputs': [...], 'stages': [{'load': {...}}, ...]}"""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix.lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Instala PyYAML para usar pipelines .yaml, o usa JSON")
+            pipeline = yaml.safe_load(f)
+        else:
+            pipeline = json.load(f)
+    if not isinstance(pipeline, dict) or not isinstance(pipeline.get('stages'), list):
+        raise ValueError("El pipeline debe tener una lista 'stages'")
+    if 'inputs' in pipeline and not _is_path_list(pipeline['inputs']):
+        raise ValueError("'inputs' debe ser una ruta o una lista de rutas")
+    for stage in pipeline['stages']:
+        name = next(iter(stage)) if isinstance(stage, dict) and len(stage) == 1 else None
+        if name not in _STAGE_RUNNERS:
+            raise ValueError(f"Etapa inválida: {stage!r}. Disponibles: {', '.join(PIPELINE_STAGES)}")
+        params = stage[name] or {}
+        if not isinstance(params, dict):
+            raise ValueError(f"Los parámetros de la etapa {name} deben ser un diccionario")
+        if name == 'combine' and 'files' not in params:
+            raise ValueError("La etapa combine necesita 'files'")
+        if 'files' in params and not _is_path_list(params['files']):
+            raise ValueError(f"'files' de la etapa {name} debe ser una ruta o una lista de rutas")
+    return pipeline
+
+def _is_path_list(value):
+    return isinstance(value, str) or (isinstance(value, list) and all(isinstance(v, str) for v in value))
+
+def run_pipeline(cli, pipeline, summary_path=None):
+    """Ejecuta las etapas para cada entrada; devuelve el código de salida (0 ok, 1 falló alguna etapa)"""
+    settings = pipeline.get('settings', {})
+    cli.optimize_dtypes = settings.get('optimize_dtypes', cli.optimize_dtypes)
+    cli.excel_backend = settings.get('excel_backend', cli.excel_backend)
+    inputs = expand_paths(pipeline['inputs']) if pipeline.get('inputs') else [None]
+    results = []
+    failed = False
+    for current in inputs:
+        if current is not None:
+            print(f"\n▶ {current}")
+        for stage in pipeline['stages']:
+            name, params = next(iter(stage.items()))
+            params = params or {}
+            start = time.perf_counter()
+            try:
+                ok = _STAGE_RUNNERS[name](cli, params, current) is not False
+                error = None
+            except Exception as e:
+                ok, error = False, str(e)
+            elapsed = time.perf_counter() - start
+            results.append({'entrada': str(current) if current else None, 'etapa': name,
+                            'ok': ok, 'segundos': round(elapsed, 3), 'error': error})
+            print(f"[{name}] {'✓' if ok else '✗'} {elapsed:.2f}s" + (f" - {error}" if error else ""))
+            if not ok:
+                failed = True
+                break
+    if summary_path:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failed, 'etapas': results}, f, indent=2, ensure_ascii=False)
+    return 1 if failed else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='excel-cli.py',
+        description="Excel CLI. Sin subcomando abre el menú interactivo.")
+    parser.add_argument('--no-optimize', action='store_true', help="No optimizar tipos tras la carga")
+    parser.add_argument('--chunk-size', type=int, help="Filas por bloque en modo streaming")
+    parser.add_argument('--startup-time', action='store_true', help="Medir el arranque hasta el menú y salir")
+    sub = parser.add_subparsers(dest='command')
+
+    run = sub.add_parser('run', help="Ejecutar un pipeline YAML/JSON")
+    run.add_argument('pipeline')
+    run.add_argument('--summary', help="Guardar tiempos y resultado por etapa en JSON")
+
+    profile = sub.add_parser('profile', help="Perfil completo de un archivo")
+    profile.add_argument('file')
+    profile.add_argument('--streaming', action='store_true')
+    profile.add_argument('--output')
+
+    dedup = sub.add_parser('dedup', help="Duplicados entre archivos con índice persistente")
+    dedup.add_argument('files', nargs='+')
+    dedup.add_argument('--keys', help="Columnas clave, ej. 'Email, Telefono:phone'")
+    dedup.add_argument('--index', default='leads')
+    dedup.add_argument('--output')
+
+    export = sub.add_parser('export', help="Exportar un archivo a Excel, CSV o SQL")
+    export.add_argument('file')
+    export.add_argument('--format', choices=['excel', 'csv', 'sql'], default='csv')
+    export.add_argument('--streaming', action='store_true')
+    export.add_argument('--output')
+    export.add_argument('--backend', choices=['openpyxl', 'xlsxwriter'])
+    export.add_argument('--table')
+    export.add_argument('--mode', choices=['schema', 'insert', 'copy', 'sqlite'], default='insert')
+    export.add_argument('--batch-size', type=int, default=1000)
+
+    combine = sub.add_parser('combine', help="Combinar muchos libros en paralelo")
+    combine.add_argument('files', nargs='+')
+    combine.add_argument('--output')
+    combine.add_argument('--workers', type=int)
+
+    accumulate = sub.add_parser('accumulate', help="Agregar un archivo al reporte acumulativo incremental")
+    accumulate.add_argument('file')
+    accumulate.add_argument('--store', default='reporte')
+    accumulate.add_argument('--keys')
+    accumulate.add_argument('--past')
+    accumulate.add_argument('--output')
+
+    formulas = sub.add_parser('formulas', help="Escribir una columna de fórmulas (o valores) en un libro nuevo "
+                                               "con la hoja de datos (no copia otras hojas ni el formato)")
+    formulas.add_argument('file')
+    formulas.add_argument('--kind', choices=FORMULA_KINDS, required=True)
+    formulas.add_argument('--column', required=True, help="Columna clave o de fechas")
+    formulas.add_argument('--reference', help="Columna con los valores existentes (estado)")
+    formulas.add_argument('--year', type=int, help="Año para la fórmula de fechas")
+    formulas.add_argument('--static', action='store_true',
+                          help="Escribir valores precalculados en lugar de fórmulas (con fórmulas, duplicados "
+                               "y estado ordenan las filas por la clave; _fila guarda el orden original)")
+    formulas.add_argument('--output')
+    formulas.add_argument('--backend', choices=['openpyxl', 'xlsxwriter'])
+    return parser
+
+def run_command(cli, args):
+    """Traduce un subcomando a un pipeline de una sola entrada"""
+    if args.command == 'run':
+        try:
+            pipeline = load_pipeline(args.pipeline)
+        except Exception as e:
+            print(f"Error leyendo pipeline: {str(e)}")
+            return 2
+        return run_pipeline(cli, pipeline, args.summary)
+
+    load = {'load': {'path': getattr(args, 'file', None), 'streaming': getattr(args, 'streaming', False)}}
+    if args.command == 'profile':
+        stages = [load, {'profile': {'output': args.output}}]
+    elif args.command == 'dedup':
+        stages = [{'dedup': {'files': args.files, 'keys': args.keys, 'index': args.index, 'output': args.output}}]
+    elif args.command == 'export':
+        stages = [load, {'export': {'format': args.format, 'output': args.output, 'backend': args.backend,
+                                    'table': args.table, 'mode': args.mode, 'batch_size': args.batch_size}}]
+    elif args.command == 'combine':
+        stages = [{'combine': {'files': args.files, 'output': args.output, 'workers': args.workers}}]
+    elif args.command == 'formulas':
+        stages = [load, {'formulas': {'kind': args.kind, 'column': args.column, 'reference': args.reference,
+                                      'year': args.year, 'static': args.static, 'output': args.output,
+                                      'backend': args.backend}}]
+    else:
+        stages = [{'accumulate': {'path': args.file, 'store': args.store, 'keys': args.keys,
+                                  'past': args.past, 'output': args.output}}]
+    return run_pipeline(cli, {'stages': stages})
+
+def report_startup():
+    """Tiempo desde el inicio del script hasta el menú y costo de cada librería pesada"""
+    with redirect_stdout(io.StringIO()):
+        print_menu()
+    ready = time.perf_counter()
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"Arranque hasta el menú: {(ready - _STARTED) * 1000:.1f} ms")
+    print(f"Librerías pesadas cargadas al inicio: {', '.join(loaded) or 'ninguna'}")
+    for name in HEAVY_MODULES:
+        if name not in sys.modules:
+            start = time.perf_counter()
+            importlib.import_module(name)
+            print(f"  {name}: {(time.perf_counter() - start) * 1000:.0f} ms en el primer uso")
+    return 0
+
+def clear_screen():
+    # Secuencia ANSI en lugar de lanzar un proceso 'clear' en cada vuelta del menú
+    if os.name == 'nt':
+        os.system('cls')
+    else:
+        print("\033[2J\033[H", end='', flush=True)
+
 def print_menu():
     print("""
 888~~                             888        e88~-_  888     888
@@ -57,11 +1855,47 @@ def analyze_data():
     print("2. Análisis de valores únicos")
     print("3. Estadísticas descriptivas")
     print("4. Análisis de fechas")
-    print("5. Volver al menú principal")
+    print("5. Perfil completo (una sola pasada)")
+    print("6. Comparar con un perfil anterior")
+    print("7. Duplicados entre archivos (índice persistente)")
+    print("8. Volver al menú principal")
     
     choice = input("Selección: ")
+
+    if choice in ("1", "2", "3", "4", "5", "6") and not cli.has_data():
+        print("No hay datos cargados")
+        return
+
+    if choice == "5":
+        run_profile(cli)
+
+    elif choice == "6":
+        previous = input("Ruta del perfil anterior (.json): ")
+        try:
+            with open(previous, 'r') as f:
+                old = json.load(f)
+            new, _ = run_profile(cli)
+            print(f"\n=== Diferencias contra {previous} ===")
+            diff_profiles(old, new)
+        except Exception as e:
+            print(f"Error comparando perfiles: {str(e)}")
+
+    elif choice == "7":
+        index_name = input("Nombre del índice (default leads): ").strip() or "leads"
+        index_file = cli.output_dir / 'dedup' / f"{index_name}.pkl"
+        keys = None
+        if not index_file.exists():
+            keys = parse_key_spec(input("Columnas clave (ej. Email, Telefono:phone): "))
+        files = expand_paths(input("Archivos a escanear (rutas, patrones o carpeta, separados por coma): "))
+        try:
+            run_dedup(cli, files, keys, index_name)
+        except Exception as e:
+            print(f"Error detectando duplicados: {str(e)}")
+
+    elif cli.streaming and choice in ("1", "2", "3", "4"):
+        analyze_stream(choice)
     
-    if choice == "1":
+    elif choice == "1":
         column = input("Columna a analizar: ")
         duplicates = cli.df[column].duplicated()
         print(f"\nTotal duplicados: {duplicates.sum()}")
@@ -89,13 +1923,115 @@ def analyze_data():
         else:
             print("No se encontraron columnas de fecha")
 
+def analyze_stream(choice):
+    """Versión por bloques de las opciones de análisis.
+
+    La memoria no crece con las filas: duplicados guarda un hash de 64 bits por
+    valor distinto y únicos es una estimación con HyperLogLog de tamaño fijo.
+    """
+    if choice == "1":
+        column = input("Columna a analizar: ")
+        seen = np.empty(0, dtype=np.uint64)
+        blank_seen = False
+        duplicates = 0
+        examples = []
+        for chunk in cli.iter_chunks():
+            values = chunk[column]
+            blank = values.isna().to_numpy()
+            # Hash del texto canónico: el mismo valor da el mismo hash con cualquier dtype del bloque
+            hashes = pd.util.hash_pandas_object(canonical_text(values), index=False).to_numpy()
+            # Duplicados dentro del bloque y contra los bloques anteriores; los vacíos
+            # se cuentan como un valor más, igual que Series.duplicated()
+            mask = pd.Series(hashes).duplicated().to_numpy() | np.isin(hashes, seen)
+            mask[blank] = pd.Series(blank[blank]).duplicated().to_numpy() | blank_seen
+            blank_seen = blank_seen or bool(blank.any())
+            duplicates += int(mask.sum())
+            if len(examples) < 5 and mask.any():
+                examples.append(chunk[mask].head(5 - len(examples)))
+            seen = np.union1d(seen, hashes[~blank])
+        print(f"\nTotal duplicados: {duplicates}")
+        print("\nEjemplos de duplicados:")
+        print(pd.concat(examples) if examples else "Sin duplicados")
+
+    elif choice == "2":
+        column = input("Columna a analizar: ")
+        hll = HyperLogLog()
+        first = {}
+        for chunk in cli.iter_chunks():
+            values = chunk[column].dropna()
+            hll.add_hashes(pd.util.hash_pandas_object(canonical_text(values), index=False).to_numpy())
+            for value in values.unique()[:5]:
+                if len(first) < 5:
+                    first.setdefault(value, None)
+        print(f"\nTotal valores únicos (aprox.): {hll.count() if first else 0}")
+        print("\nPrimeros 5 valores únicos:")
+        print(list(first)[:5])
+
+    elif choice == "3":
+        stats = {}
+        for chunk in cli.iter_chunks():
+            numeric = chunk.select_dtypes(include=['number'])
+            for col in numeric.columns:
+                _merge_moments(stats, col, numeric[col].dropna())
+        print("\nEstadísticas descriptivas:")
+        if stats:
+            print(pd.DataFrame({
+                col: {
+                    'count': s['count'],
+                    'mean': s['mean'],
+                    'std': np.sqrt(s['m2'] / (s['count'] - 1)) if s['count'] > 1 else np.nan,
+                    'min': s['min'],
+                    'max': s['max'],
+                } for col, s in stats.items()
+            }))
+        else:
+            print("No se encontraron columnas numéricas")
+
+    elif choice == "4":
+        ranges = {}
+        for chunk in cli.iter_chunks():
+            for col in chunk.select_dtypes(include=['datetime64']).columns:
+                low, high = chunk[col].min(), chunk[col].max()
+                if pd.isna(low):
+                    continue
+                if col in ranges:
+                    low, high = min(low, ranges[col][0]), max(high, ranges[col][1])
+                ranges[col] = (low, high)
+        if ranges:
+            print("\nColumnas de fecha encontradas:")
+            for col, (low, high) in ranges.items():
+                print(f"\n{col}:")
+                print(f"Rango: {low} a {high}")
+        else:
+            print("No se encontraron columnas de fecha")
+
+def _merge_moments(stats, col, values):
+    # Combinación de media/varianza por bloques (Chan et al.)
+    n = len(values)
+    if n == 0:
+        return
+    mean = values.mean()
+    m2 = ((values - mean) ** 2).sum()
+    s = stats.get(col)
+    if s is None:
+        stats[col] = {'count': n, 'mean': mean, 'm2': m2, 'min': values.min(), 'max': values.max()}
+        return
+    total = s['count'] + n
+    delta = mean - s['mean']
+    s['m2'] += m2 + delta ** 2 * s['count'] * n / total
+    s['mean'] += delta * n / total
+    s['count'] = total
+    s['min'] = min(s['min'], values.min())
+    s['max'] = max(s['max'], values.max())
+
 def generate_formulas():
     print("\n=== Generador de Fórmulas ===")
     print("1. Fórmula de duplicados")
     print("2. Fórmula de valores únicos")
     print("3. Fórmula de estado")
     print("4. Fórmula de fechas")
-    print("5. Volver al menú principal")
+    print("5. Escribir fórmulas en un libro nuevo")
+    print("6. Volver al menú principal")
     
     choice = input("Selección: ")
     
@@ -115,6 +2051,36 @@ def generate_formulas():
         print("\nFórmula para fechas:")
         print("=IF(AND(A2>=DATE(2024,1,1), A2<=DATE(2024,12,31)), \"2024\", \"Otro Año\")")
 
+    elif choice == "5":
+        write_formulas_menu()
+
+def write_formulas_menu():
+    if cli.df is None:
+        print("❌ Primero carga un archivo completo (sin modo streaming)")
+        return
+    print("\nFórmula: 1. Duplicados  2. Valores únicos  3. Estado  4. Fechas")
+    kind = {'1': 'duplicados', '2': 'unicos', '3': 'estado', '4': 'fechas'}.get(input("Selección: ").strip())
+    if not kind:
+        print("Opción inválida")
+        return
+    print(f"Columnas: {', '.join(map(str, cli.df.columns))}")
+    column = input("Columna clave: " if kind != 'fechas' else "Columna de fechas: ").strip()
+    reference = input("Columna con los valores existentes: ").strip() if kind == 'estado' else None
+    year = None
+    if kind == 'fechas':
+        year = input(f"Año (default {datetime.now().year}): ").strip() or None
+    # Con muchas filas conviene no dejar fórmulas que Excel tenga que recalcular
+    default = '2' if len(cli.df) > 100000 else '1'
+    mode = input(f"Modo: 1. Fórmulas  2. Valores precalculados (default {default}): ").strip() or default
+    if mode != '2' and kind in ('duplicados', 'estado'):
+        print(f"⚠ Con fórmulas las filas se escriben ordenadas por '{column}' (la columna _fila guarda el orden original)")
+        if input("¿Continuar? (s/n): ").strip().lower() != 's':
+            return
+    try:
+        write_formulas(cli, kind, column, mode == '2', reference, year)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+
 def process_reports():
     print("\n=== Procesamiento de Reportes ===")
     print("1. Generar reporte acumulativo")
@@ -124,7 +2090,22 @@ def process_reports():
     
     choice = input("Selección: ")
     
-    if choice == "1":
+    if choice == "1" and input("¿Modo incremental (solo agrega filas nuevas)? (s/n): ").strip().lower() == 's':
+        store_name = input("Nombre del acumulado (default reporte): ").strip() or "reporte"
+        store_file = cli.output_dir / 'acumulado' / f"{store_name}.sqlite"
+        keys = None
+        past_data = None
+        if not store_file.exists():
+            keys = parse_key_spec(input("Columnas clave para deduplicar (vacío = fila completa): "))
+            past_data = input("Ruta de datos pasados (vacío si no hay): ").strip() or None
+        current_data = input("Ruta de datos actuales: ")
+
+        try:
+            run_incremental_report(cli, store_name, current_data, keys, past_data)
+        except Exception as e:
+            print(f"Error procesando reporte: {str(e)}")
+
+    elif choice == "1":
         template = input("Ruta del template: ")
         past_data = input("Ruta de datos pasados: ")
         current_data = input("Ruta de datos actuales: ")
@@ -139,14 +2120,38 @@ def process_reports():
             
             # Guardar resultado
             output_path = cli.output_dir / f"reporte_acumulativo_{datetime.now().strftime('%Y%m%d')}.xlsx"
-            combined_df.to_excel(output_path, index=False)
+            write_excel_chunks(frame_chunks(combined_df, cli.chunk_size), output_path, cli.excel_backend)
             print(f"✓ Reporte generado: {output_path}")
             
         except Exception as e:
             print(f"Error procesando reporte: {str(e)}")
 
+    elif choice == "3":
+        files = expand_paths(input("Archivos a combinar (rutas, patrones o carpeta, separados por coma): "))
+        output_format = input("Formato de salida (xlsx/csv, default xlsx): ").strip().lower() or "xlsx"
+        workers = input(f"Procesos en paralelo (default {os.cpu_count()}): ").strip()
+        output_path = cli.output_dir / f"reporte_combinado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{'csv' if output_format == 'csv' else 'xlsx'}"
+        try:
+            combine_reports(cli, files, output_path, int(workers) if workers else None)
+        except Exception as e:
+            print(f"Error combinando reportes: {str(e)}")
+
+def export_excel(cli, output_path=None, backend=None):
+    output_path = output_path or cli.output_dir / f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    chunks = cli.iter_chunks() if cli.streaming else frame_chunks(cli.df, cli.chunk_size)
+    sheets = write_excel_chunks(chunks, output_path, backend or cli.excel_backend)
+    print(f"✓ Datos exportados a: {output_path}" + (f" ({sheets} hojas)" if sheets > 1 else ""))
+    return output_path
+
+def export_csv(cli, output_path=None):
+    output_path = output_path or cli.output_dir / f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    for i, chunk in enumerate(cli.chunks()):
+        chunk.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+    print(f"✓ Datos exportados a: {output_path}")
+    return output_path
+
 def export_results():
-    if cli.df is None:
+    if not cli.has_data():
         print("No hay datos cargados")
         return
     
@@ -159,51 +2164,61 @@ def export_results():
     choice = input("Selección: ")
     
     if choice == "1":
-        output_path = cli.output_dir / f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        cli.df.to_excel(output_path, index=False)
-        print(f"✓ Datos exportados a: {output_path}")
+        backend = input(f"Motor de escritura (openpyxl/xlsxwriter, default {cli.excel_backend}): ").strip().lower() or cli.excel_backend
+        try:
+            export_excel(cli, backend=backend)
+        except ImportError:
+            print("xlsxwriter no está instalado; usa el motor openpyxl")
     
     elif choice == "2":
-        output_path = cli.output_dir / f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        cli.df.to_csv(output_path, index=False)
-        print(f"✓ Datos exportados a: {output_path}")
+        export_csv(cli)
     
     elif choice == "3":
         print("\nGenerando script SQL...")
         table_name = input("Nombre de la tabla: ")
-        
-        # Generar CREATE TABLE
-        create_table = f"CREATE TABLE {table_name} (\n"
-        for col in cli.df.columns:
-            dtype = cli.df[col].dtype
-            if dtype == 'int64':
-                sql_type = 'INT'
-            elif dtype == 'float64':
-                sql_type = 'FLOAT'
-            elif dtype == 'datetime64[ns]':
-                sql_type = 'DATETIME'
-            else:
-                sql_type = 'VARCHAR(255)'
-            create_table += f"    {col} {sql_type},\n"
-        create_table = create_table.rstrip(",\n") + "\n);"
-        
-        # Guardar script
-        output_path = cli.output_dir / f"create_table_{table_name}.sql"
-        with open(output_path, 'w') as f:
-            f.write(create_table)
-        print(f"✓ Script SQL generado: {output_path}")
+        print("1. Solo CREATE TABLE")
+        print("2. INSERT multi-fila por lotes")
+        print("3. CSV compatible con COPY + script de carga")
+        print("4. Cargar directo a SQLite")
+        mode = {"1": "schema", "2": "insert", "3": "copy", "4": "sqlite"}.get(input("Modo (default 2): ").strip() or "2")
+        if mode is None:
+            print("Opción inválida")
+            return
+        batch_size = 1000
+        if mode == "insert":
+            batch_size = int(input("Filas por INSERT (default 1000): ").strip() or 1000)
+        try:
+            export_sql(cli, table_name, mode, batch_size)
+        except Exception as e:
+            print(f"Error exportando a SQL: {str(e)}")
 
-def main():
+def main(argv=None):
     global cli
+    args = build_parser().parse_args(argv)
     cli = ExcelCLI()
-    
+    if args.no_optimize:
+        cli.optimize_dtypes = False
+    if args.chunk_size:
+        cli.chunk_size = args.chunk_size
+    if args.startup_time:
+        return report_startup()
+    if args.command:
+        return run_command(cli, args)
+    interactive()
+    return 0
+
+def interactive():
     while True:
         print_menu()
         choice = input("Selecciona una opción: ")
 
         if choice == "1":
             filepath = input("Ruta del archivo Excel: ")
-            cli.load_file(filepath)
+            streaming = input("¿Modo streaming por bloques? (s/n): ").strip().lower() == 's'
+            chunk_size = None
+            if streaming:
+                chunk_size = input(f"Filas por bloque (default {cli.chunk_size}): ").strip() or None
+            cli.load_file(filepath, streaming=streaming, chunk_size=chunk_size)
         elif choice == "2": analyze_data()
         elif choice == "3": generate_formulas()
         elif choice == "4": process_reports()
@@ -215,7 +2230,7 @@ def main():
             print("Opción inválida, intenta nuevamente")
 
         input("\nPresiona Enter para continuar...")
-        os.system('cls' if os.name == 'nt' else 'clear')
+        clear_screen()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
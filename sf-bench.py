@@ -0,0 +1,265 @@
+"""Benchmarks reproducibles de sf-cli contra el servidor falso (sf-fake-server.py).
+
+Carga sf-cli.py y sf-fake-server.py con importlib, levanta el servidor en un
+puerto libre y ejecuta cada escenario a través de las clases de la CLI
+(SalesforceCLI, SessionManager, QueryManager, ...). Por escenario reporta
+rendimiento, percentiles de latencia y número de peticiones HTTP, y guarda
+los resultados en JSON para compararlos entre versiones.
+
+Uso:
+    python sf-bench.py --records 20000 --latency-ms 20 --output bench.json
+    python sf-bench.py --compare bench.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import builtins
+import shutil
+import tempfile
+import threading
+import functools
+import importlib.util
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any
+
+HERE = Path(__file__).resolve().parent
+
+def load_module(name: str, filename: str):
+    spec = importlib.util.spec_from_file_location(name, HERE / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+class ScriptedInput:
+    """Reemplaza input() con respuestas fijas mientras corre un escenario"""
+    def __init__(self, answers: list):
+        self.answers = list(answers)
+
+    def __call__(self, prompt: str = '') -> str:
+        if not self.answers:
+            raise RuntimeError(f"Sin respuesta para: {prompt}")
+        return self.answers.pop(0)
+
+class Bench:
+    def __init__(self, sf_cli, fake, server, args):
+        self.sf_cli = sf_cli
+        self.fake = fake
+        self.server = server
+        self.args = args
+        host, port = server.server_address[:2]
+        self.base = f"http://{host}:{port}"
+        self.instance_url = f"{self.base}/services/data/v{fake.API_VERSION}/"
+        self.cli = self._new_cli()
+
+    def _new_cli(self):
+        cli = self.sf_cli.SalesforceCLI()
+        cli.sessions = {}
+        for i in range(self.args.sessions):
+            cli.sessions[f"org{i + 1}"] = self.sf_cli.SalesforceSession(
+                f"bench{i + 1}@ejemplo.com", 'test', self.instance_url, 'fake-token')
+        cli.current_session = 'org1'
+        return cli
+
+    def _calls(self) -> int:
+        return self.server.org.api_calls
+
+    def run(self, name: str, operation, iterations: int, unit: str = 'ops', units: int = 1) -> Dict[str, Any]:
+        """Ejecuta operation() iterations veces; units es cuántos `unit` procesa cada iteración"""
+        latencies = []
+        calls_before = self._calls()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            for _ in range(iterations):
+                began = time.perf_counter()
+                operation()
+                latencies.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        calls = self._calls() - calls_before
+        result = {
+            'iterations': iterations,
+            'seconds': round(elapsed, 4),
+            'throughput': round(iterations * units / elapsed, 2) if elapsed else None,
+            'unit': unit,
+            'p50_ms': round(self.sf_cli.percentile(latencies, 0.5) * 1000, 3),
+            'p95_ms': round(self.sf_cli.percentile(latencies, 0.95) * 1000, 3),
+            'requests': calls,
+            'requests_per_iteration': round(calls / iterations, 2),
+        }
+        print(f"✓ {name:<20} {result['throughput']:>12,.1f} {unit}/s | "
+              f"p50 {result['p50_ms']:>9.2f} ms | p95 {result['p95_ms']:>9.2f} ms | {calls} peticiones")
+        return result
+
+    # --- escenarios ---
+    def scenario_login(self) -> Dict[str, Any]:
+        """SessionManager.login completo (SOAP) con el dominio redirigido al servidor falso"""
+        # sf-cli importa simple_salesforce al primer uso: se parchea el módulo real
+        api = importlib.import_module('simple_salesforce.api')
+        original = api.Salesforce
+        http = self.sf_cli.requests.Session()
+        adapter = self.sf_cli.plain_http_adapter(self.base)
+        http.mount('https://login.salesforce.com', adapter)
+        http.mount('https://test.salesforce.com', adapter)
+        api.Salesforce = functools.partial(original, session=http)
+        manager = self.sf_cli.SessionManager(self.cli)
+        counter = iter(range(10 ** 9))
+
+        def login():
+            builtins.input = ScriptedInput(['2', 'bench@ejemplo.com', self.server.org.password, 'n', f"login{next(counter)}"])
+            if not manager.login():
+                raise RuntimeError("login falló")
+        try:
+            # El login SOAP no lleva token Bearer, así que se mide por latencia, no por peticiones REST
+            return self.run('login', login, self.args.iterations)
+        finally:
+            api.Salesforce = original
+            builtins.input = self.real_input
+            self.cli.sessions = {name: session for name, session in self.cli.sessions.items() if not name.startswith('login')}
+            self.cli.current_session = 'org1'
+
+    def scenario_menu_redraw(self) -> Dict[str, Any]:
+        """show_current_session en cada vuelta del menú (validación en caché)"""
+        self.cli.validate_current_session(force=True)
+        return self.run('menu_redraw', lambda: self.sf_cli.show_current_session(self.cli), self.args.iterations * 10)
+
+    def scenario_validate_probe(self) -> Dict[str, Any]:
+        return self.run('validate_probe', lambda: self.cli.validate_current_session(force=True), self.args.iterations)
+
+    def scenario_metadata(self) -> Dict[str, Any]:
+        """Describe global + por objeto: la primera vuelta descarga, las demás salen de la caché"""
+        for name in self.cli.sessions:
+            self.cli.metadata.clear(name)
+
+        def describe():
+            self.cli.metadata.sobject_names()
+            self.cli.metadata.fields('Opportunity')
+        return self.run('metadata', describe, self.args.iterations)
+
+    def scenario_query_rest(self) -> Dict[str, Any]:
+        """QueryManager.execute_query paginado a CSV"""
+        manager = self.sf_cli.QueryManager(self.cli)
+        output = Path(self.workdir) / 'bench_query.csv'
+
+        def query():
+            manager.execute_query("SELECT Id, Name, Email, CreatedDate FROM Lead", 'csv', output)
+        return self.run('query_rest', query, max(1, self.args.iterations // 5), 'registros', self.args.records)
+
+    def scenario_explain(self) -> Dict[str, Any]:
+        sf = self.cli.get_current_sf()
+        return self.run('explain', lambda: self.sf_cli.explain_query(sf, "SELECT Id FROM Lead WHERE Email2__c != null"),
+                        self.args.iterations)
+
+    def scenario_collections(self) -> Dict[str, Any]:
+        """CollectionsExecutor.update en lotes de 200"""
+        sf = self.cli.get_current_sf()
+        executor = self.sf_cli.CollectionsExecutor(sf, output_dir=Path(self.workdir))
+        total = min(self.args.records, 5000)
+        records = [{'Id': self.fake.make_id('00Q', i), 'Name': 'bench'} for i in range(total)]
+        return self.run('collections_update', lambda: executor.update('Lead', records),
+                        max(1, self.args.iterations // 5), 'registros', total)
+
+    def scenario_bulk_query(self) -> Dict[str, Any]:
+        sf = self.cli.get_current_sf()
+        bulk = self.sf_cli.BulkJobManager(sf, poll_interval=0.05, output_dir=Path(self.workdir))
+        output = Path(self.workdir) / 'bench_bulk.csv'
+        return self.run('bulk_query', lambda: bulk.query("SELECT Id, Name FROM Account", output),
+                        max(1, self.args.iterations // 5), 'registros', self.args.records)
+
+    def scenario_multi_org(self) -> Dict[str, Any]:
+        """MultiOrgExecutor.query con COUNT() en todas las sesiones"""
+        executor = self.sf_cli.MultiOrgExecutor(self.cli)
+        names = list(self.cli.sessions)
+        return self.run('multi_org', lambda: executor.query(names, "SELECT COUNT() FROM Lead"),
+                        self.args.iterations, 'sesiones', len(names))
+
+    SCENARIOS = ('login', 'menu_redraw', 'validate_probe', 'metadata', 'query_rest', 'explain',
+                 'collections', 'bulk_query', 'multi_org')
+
+    def run_all(self, names: list) -> Dict[str, Any]:
+        self.real_input = builtins.input
+        self.workdir = tempfile.mkdtemp(prefix='sf-bench-')
+        results = {}
+        for name in names:
+            try:
+                results[name] = getattr(self, f"scenario_{name}")()
+            except Exception as e:
+                print(f"❌ {name}: {str(e)}")
+                results[name] = {'error': str(e)}
+        return results
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]):
+    """Imprime la variación de rendimiento y p95 contra una corrida anterior"""
+    print(f"\n📊 Comparación con {previous.get('generated', '?')}")
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before or 'error' in result or 'error' in before or not before.get('throughput'):
+            continue
+        throughput = (result['throughput'] / before['throughput'] - 1) * 100
+        p95 = (result['p95_ms'] / before['p95_ms'] - 1) * 100 if before.get('p95_ms') else 0
+        marker = '⚠' if throughput < -10 or p95 > 10 else '✓'
+        print(f"{marker} {name:<20} rendimiento {throughput:+7.1f}% | p95 {p95:+7.1f}% | "
+              f"peticiones {before['requests']} → {result['requests']}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de sf-cli contra un Salesforce falso local")
+    parser.add_argument('--records', type=int, default=10000, help="registros por objeto en el servidor")
+    parser.add_argument('--page-size', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="latencia simulada por petición")
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--sessions', type=int, default=8, help="sesiones guardadas para multi_org")
+    parser.add_argument('--scenarios', default=','.join(Bench.SCENARIOS), help="lista separada por comas")
+    parser.add_argument('--output', help="archivo JSON de resultados (default outputs/sf_bench_<fecha>.json)")
+    parser.add_argument('--compare', help="JSON de una corrida anterior")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in Bench.SCENARIOS]
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(unknown)}")
+
+    # Configuración aislada: la CLI no debe tocar ~/.sf-cli del usuario
+    home = tempfile.mkdtemp(prefix='sf-bench-home-')
+    os.environ['HOME'] = os.environ['USERPROFILE'] = home
+
+    sf_cli = load_module('sf_cli', 'sf-cli.py')
+    fake = load_module('sf_fake_server', 'sf-fake-server.py')
+    server = fake.build_server(records=args.records, page_size=args.page_size,
+                               latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🚀 Servidor falso en {server.server_address[0]}:{server.server_address[1]} | "
+          f"{args.records} registros | latencia {args.latency_ms} ms\n")
+
+    bench = Bench(sf_cli, fake, server, args)
+    try:
+        scenarios = bench.run_all(names)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(bench.workdir, ignore_errors=True)
+        shutil.rmtree(home, ignore_errors=True)
+
+    result = {
+        'generated': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'scenarios': scenarios,
+    }
+    output = Path(args.output) if args.output else Path('outputs') / f"sf_bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n✓ Resultados: {os.path.abspath(output)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+    return 1 if any('error' in value for value in scenarios.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,57 @@
+from __future__ import annotations
+import time
+_STARTED = time.perf_counter()
 import os
+import io
+import re
+import csv
+import sys
 import webbrowser
 import json
-from simple_salesforce.api import Salesforce
+import math
+import signal
+import socket
+import argparse
+import importlib
+import threading
+import subprocess
+import socketserver
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from email.utils import formatdate
+from functools import lru_cache, partial
+from urllib.parse import urlsplit, urlunsplit
 from pathlib import Path
-from typing import Optional, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from simple_salesforce.api import Salesforce
+
+try:
+    import readline
+except ImportError:  # Windows sin pyreadline
+    readline = None
+
+class _LazyModule:
+    """Módulo que se importa en el primer acceso a uno de sus atributos.
+
+    simple_salesforce (y requests con él) tarda cientos de milisegundos en
+    cargar; listar sesiones, la ayuda y las plantillas no lo necesitan.
+    """
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+requests = _LazyModule('requests')
+salesforce_api = _LazyModule('simple_salesforce.api')
+HEAVY_MODULES = ('requests', 'simple_salesforce.api')
 
 class SalesforceSession:
     def __init__(self, username: str, instance_type: str, instance_url: str, access_token: str):
@@ -29,13 +77,245 @@ class SalesforceSession:
             'access_token': self.access_token
         }
 
+_ID_RE = re.compile(r'/(?=[a-zA-Z]*\d)[a-zA-Z0-9]{15}(?:[a-zA-Z0-9]{3})?(?=/|$)')
+_LOCATOR_RE = re.compile(r'/query/[^/]+$')
+_API_USAGE_RE = re.compile(r'api-usage=(\d+)/(\d+)')
+
+def endpoint_of(url: str) -> str:
+    """Ruta REST normalizada: sin host, versión, parámetros ni Ids (sobjects/Lead/:id)"""
+    path = url.split('?', 1)[0]
+    path = re.sub(r'^https?://[^/]+', '', path)
+    path = re.sub(r'^/services/data/v[\d.]+', '', path)
+    path = _LOCATOR_RE.sub('/query/:locator', path)
+    path = _ID_RE.sub('/:id', path)
+    return path.strip('/') or '/'
+
+def _prometheus_escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def percentile(values: list, q: float) -> Optional[float]:
+    """Percentil por rango más cercano"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Rango ceil(q·n); round() redondea las mitades al par y no sirve aquí
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+class RequestStats:
+    """Registro de todas las llamadas HTTP hechas por los clientes de la CLI.
+
+    Se alimenta desde el hook de respuesta de cada sesión: endpoint, método,
+    estado, latencia, bytes enviados y recibidos y el encabezado
+    Sforce-Limit-Info con el consumo diario de API.
+    """
+    def __init__(self, max_samples: int = 5000):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, deque] = {}
+        self.counts: Dict[str, Dict[tuple, int]] = {}
+        self.api_usage: Dict[str, tuple] = {}
+        self.max_samples = max_samples
+
+    def record(self, session: str, response, stream: bool = False):
+        request = response.request
+        body = request.body or b''
+        # Con stream=True el cuerpo aún no se leyó; no se fuerza la descarga
+        received = response.headers.get('Content-Length')
+        if received is None and not stream:
+            received = len(response.content)
+        sample = {
+            'endpoint': endpoint_of(request.url),
+            'method': request.method,
+            'status': response.status_code,
+            'seconds': response.elapsed.total_seconds(),
+            'sent': len(body),
+            'received': int(received) if received is not None else None,
+            'time': time.time(),
+        }
+        usage = _API_USAGE_RE.search(response.headers.get('Sforce-Limit-Info', ''))
+        with self._lock:
+            self.requests.setdefault(session, deque(maxlen=self.max_samples)).append(sample)
+            key = (sample['method'], sample['endpoint'], sample['status'])
+            counts = self.counts.setdefault(session, {})
+            counts[key] = counts.get(key, 0) + 1
+            if usage:
+                self.api_usage[session] = (int(usage.group(1)), int(usage.group(2)))
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = {name: list(samples) for name, samples in self.requests.items()}
+            counts = {name: dict(values) for name, values in self.counts.items()}
+            usage = dict(self.api_usage)
+        result = {}
+        for name, samples in sessions.items():
+            latencies = [sample['seconds'] for sample in samples]
+            endpoints: Dict[str, Dict[str, Any]] = {}
+            for sample in samples:
+                endpoint = endpoints.setdefault(f"{sample['method']} {sample['endpoint']}", {'latencies': [], 'bytes': 0})
+                endpoint['latencies'].append(sample['seconds'])
+                endpoint['bytes'] += sample['received'] or 0
+            used, limit = usage.get(name, (None, None))
+            result[name] = {
+                'calls': sum(counts.get(name, {}).values()),
+                'p50': percentile(latencies, 0.5),
+                'p95': percentile(latencies, 0.95),
+                'bytes_sent': sum(sample['sent'] for sample in samples),
+                'bytes_received': sum(sample['received'] or 0 for sample in samples),
+                'api_used': used,
+                'api_max': limit,
+                'api_remaining': limit - used if used is not None else None,
+                'counts': [{'method': method, 'endpoint': endpoint, 'status': status, 'calls': calls}
+                           for (method, endpoint, status), calls in sorted(counts.get(name, {}).items())],
+                'endpoints': {key: {'calls': len(values['latencies']),
+                                    'p50': percentile(values['latencies'], 0.5),
+                                    'p95': percentile(values['latencies'], 0.95),
+                                    'bytes_received': values['bytes']}
+                              for key, values in sorted(endpoints.items())},
+            }
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps({'generated': datetime.now().isoformat(), 'sessions': self.summary()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        def labels(**values):
+            return '{' + ','.join(f'{key}="{_prometheus_escape(value)}"' for key, value in values.items()) + '}'
+
+        summary = self.summary()
+        lines = [
+            '# HELP sfcli_requests_total Llamadas HTTP por sesión, endpoint y estado',
+            '# TYPE sfcli_requests_total counter',
+        ]
+        for name, data in summary.items():
+            for item in data['counts']:
+                lines.append(f"sfcli_requests_total{labels(session=name, method=item['method'], endpoint=item['endpoint'], status=item['status'])} {item['calls']}")
+        lines += ['# HELP sfcli_request_latency_seconds Latencia de las últimas llamadas',
+                  '# TYPE sfcli_request_latency_seconds summary']
+        for name, data in summary.items():
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95')):
+                if data[key] is not None:
+                    lines.append(f"sfcli_request_latency_seconds{labels(session=name, quantile=quantile)} {data[key]:.6f}")
+        lines += ['# HELP sfcli_response_bytes_total Bytes recibidos',
+                  '# TYPE sfcli_response_bytes_total counter']
+        lines += [f"sfcli_response_bytes_total{labels(session=name)} {data['bytes_received']}" for name, data in summary.items()]
+        lines += ['# HELP sfcli_api_daily_remaining Llamadas de API diarias restantes según Sforce-Limit-Info',
+                  '# TYPE sfcli_api_daily_remaining gauge']
+        lines += [f"sfcli_api_daily_remaining{labels(session=name)} {data['api_remaining']}"
+                  for name, data in summary.items() if data['api_remaining'] is not None]
+        return '\n'.join(lines) + '\n'
+
+@lru_cache(maxsize=None)
+def _plain_http_adapter_class() -> type:
+    # La clase hereda de HTTPAdapter, así que se define al primer uso de requests
+    class PlainHttpAdapter(requests.adapters.HTTPAdapter):
+        def __init__(self, target: str, **kwargs):
+            self.target = urlsplit(target)
+            super().__init__(**kwargs)
+
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            request.url = urlunsplit((self.target.scheme, self.target.netloc, parts.path, parts.query, parts.fragment))
+            return super().send(request, **kwargs)
+    return PlainHttpAdapter
+
+def plain_http_adapter(target: str, **kwargs):
+    """Adaptador que envía por http las URL https de un host.
+
+    simple_salesforce siempre arma URLs https; con instancias locales en http
+    (por ejemplo sf-fake-server.py) este adaptador reescribe esquema y host.
+    """
+    return _plain_http_adapter_class()(target, **kwargs)
+
+class AgentError(Exception):
+    pass
+
+class AgentClient:
+    """Cliente del agente de sesiones (ver SessionAgent).
+
+    Cada petición abre su propia conexión al socket Unix, así que se puede usar
+    desde varios hilos a la vez. La disponibilidad se cachea unos segundos para
+    no hacer un ping en cada acceso.
+    """
+    def __init__(self, socket_path: Path, timeout: float = 300.0, check_interval: float = 5.0):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self._checked: Optional[tuple] = None
+
+    def available(self, refresh: bool = False) -> bool:
+        if not hasattr(socket, 'AF_UNIX') or not self.socket_path.exists():
+            return False
+        now = time.monotonic()
+        if not refresh and self._checked and now - self._checked[1] < self.check_interval:
+            return self._checked[0]
+        try:
+            self.request('ping', timeout=2.0)
+            alive = True
+        except AgentError:
+            alive = False
+        self._checked = (alive, now)
+        return alive
+
+    def request(self, op: str, timeout: Optional[float] = None, **params) -> Any:
+        """Envía una petición y devuelve su resultado; los errores del agente llegan como AgentError"""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout or self.timeout)
+                sock.connect(str(self.socket_path))
+                sock.sendall(json.dumps({'op': op, **params}).encode('utf-8') + b'\n')
+                with sock.makefile('rb') as stream:
+                    line = stream.readline()
+        except OSError as e:
+            self._checked = (False, time.monotonic())
+            raise AgentError(f"Agente no disponible: {str(e)}")
+        if not line:
+            self._checked = (False, time.monotonic())
+            raise AgentError("El agente cerró la conexión")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise AgentError(response.get('error', 'error desconocido'))
+        return response.get('result')
+
+class RemoteSalesforce:
+    """Cliente de una sesión cuyas llamadas REST resuelve el agente.
+
+    query, query_more, restful, limits y describe viajan por el socket y usan
+    el pool y la validación del agente. Lo que necesita HTTP directo (Bulk API,
+    encabezados, base_url) cae en un cliente local que se crea al primer uso.
+    """
+    REMOTE_METHODS = ('query', 'query_more', 'query_all', 'restful', 'limits', 'describe')
+
+    def __init__(self, cli: 'SalesforceCLI', name: str):
+        self.cli = cli
+        self.name = name
+
+    def __getattr__(self, attr: str):
+        if attr in self.REMOTE_METHODS:
+            def call(*args, **kwargs):
+                return self.cli.agent.request('call', session=self.name, method=attr, args=args, kwargs=kwargs)
+            return call
+        return getattr(self.cli.local_sf(self.name), attr)
+
 class SalesforceCLI:
-    def __init__(self):
+    def __init__(self, use_agent: bool = True):
         self.config_dir = Path.home() / '.sf-cli'
         self.config_file = self.config_dir / 'config.json'
         self.sessions: Dict[str, SalesforceSession] = {}
         self.current_session: Optional[str] = None
+        # Un cliente por sesión guardada, con su propio pool HTTP keep-alive
+        self._clients: Dict[str, Salesforce] = {}
+        self._clients_lock = threading.Lock()
+        # Última validación por sesión: (válida, instante); cualquier llamada exitosa cuenta
+        self.settings: Dict[str, Any] = {'validation_ttl': 300}
+        self._validation: Dict[str, tuple] = {}
+        # Token que recibió un 401 por sesión: no se vuelve a usar hasta un nuevo login
+        self._expired: Dict[str, str] = {}
+        self._probes: Dict[str, threading.Thread] = {}
+        self.stats = RequestStats()
         self.initialize_config()
+        self.metadata = MetadataCache(self)
+        # Con el agente corriendo, las llamadas REST y la validación pasan por él
+        use_agent = use_agent and self.settings.get('use_agent', True)
+        self.agent = AgentClient(self.config_dir / 'agent.sock') if use_agent else None
 
     def initialize_config(self):
         if not self.config_dir.exists():
@@ -49,7 +329,8 @@ class SalesforceCLI:
         with open(self.config_file, 'w') as f:
             json.dump({
                 'sessions': {name: session.to_dict() for name, session in self.sessions.items()},
-                'current_session': self.current_session
+                'current_session': self.current_session,
+                'settings': self.settings
             }, f, indent=4)
 
     def load_config(self):
@@ -61,32 +342,157 @@ class SalesforceCLI:
                     for name, session_data in data.get('sessions', {}).items()
                 }
                 self.current_session = data.get('current_session')
+                self.settings.update(data.get('settings', {}))
 
-    def get_current_sf(self) -> Optional[Salesforce]:
-        if not self.current_session or self.current_session not in self.sessions:
-            return None
-        
-        session = self.sessions[self.current_session]
-        return Salesforce(
+    def reload_config(self):
+        """Relee config.json y descarta clientes y validaciones de sesiones que cambiaron o ya no existen"""
+        before = {name: session.to_dict() for name, session in self.sessions.items()}
+        self.load_config()
+        for name, data in before.items():
+            session = self.sessions.get(name)
+            if session is None or session.to_dict() != data:
+                self.invalidate_client(name)
+                self._validation.pop(name, None)
+
+    def agent_available(self) -> bool:
+        return self.agent is not None and self.agent.available()
+
+    def _build_client(self, name: str, session: SalesforceSession) -> Salesforce:
+        http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        http.mount('https://', adapter)
+        http.mount('http://', adapter)
+        if session.instance_url.startswith('http://'):
+            host = urlsplit(session.instance_url).netloc
+            http.mount(f'https://{host}', plain_http_adapter(f'http://{host}', pool_connections=4, pool_maxsize=16))
+
+        def on_response(response, *args, **kwargs):
+            self.stats.record(name, response, kwargs.get('stream', False))
+            # 401: el token ya no sirve; se descarta el cliente (sin cerrar el pool:
+            # la respuesta todavía se está leyendo) y no se reconstruye con el mismo token
+            if response.status_code == 401:
+                self._expired[name] = session.access_token
+                self.mark_session(name, False)
+                self.invalidate_client(name, close=False)
+            elif response.ok:
+                self.mark_session(name, True)
+
+        http.hooks['response'].append(on_response)
+        return salesforce_api.Salesforce(
             instance_url=session.instance_url,
-            session_id=session.access_token
+            session_id=session.access_token,
+            session=http
         )
 
-    def validate_current_session(self) -> bool:
-        """Valida si la sesión actual es válida"""
+    def get_sf(self, name: str) -> Optional[Salesforce]:
+        """Cliente de la sesión: el del agente si está corriendo, si no el local cacheado"""
+        if name not in self.sessions:
+            return None
+        if self.session_expired(name):
+            print(f"❌ La sesión '{name}' expiró; vuelve a hacer login en 'Gestión de Sesiones'")
+            return None
+        if self.agent_available():
+            return RemoteSalesforce(self, name)
+        return self.local_sf(name)
+
+    def session_expired(self, name: str) -> bool:
+        """True si el token guardado de la sesión ya recibió un 401"""
+        session = self.sessions.get(name)
+        return session is not None and self._expired.get(name) == session.access_token
+
+    def local_sf(self, name: str) -> Optional[Salesforce]:
+        """Devuelve el cliente cacheado de la sesión, creándolo la primera vez"""
+        session = self.sessions.get(name)
+        if not session or self.session_expired(name):
+            return None
+        with self._clients_lock:
+            sf = self._clients.get(name)
+            if sf is None:
+                sf = self._clients[name] = self._build_client(name, session)
+            return sf
+
+    def invalidate_client(self, name: Optional[str] = None, close: bool = True):
+        """Cierra y descarta el cliente de una sesión (o de todas si name es None)"""
+        with self._clients_lock:
+            names = list(self._clients) if name is None else [name]
+            for client_name in names:
+                sf = self._clients.pop(client_name, None)
+                if sf is not None and close:
+                    sf.session.close()
+
+    def get_current_sf(self) -> Optional[Salesforce]:
         if not self.current_session or self.current_session not in self.sessions:
+            return None
+        return self.get_sf(self.current_session)
+
+    def mark_session(self, name: str, valid: bool):
+        self._validation[name] = (valid, time.monotonic())
+
+    def session_status(self, name: Optional[str] = None) -> tuple:
+        """(válida o None si nunca se verificó, segundos desde la última verificación)"""
+        name = name or self.current_session
+        if self.agent_available():
+            try:
+                valid, age = self.agent.request('session_status', session=name)
+                return valid, age
+            except AgentError:
+                pass
+        if name not in self._validation:
+            return None, None
+        valid, checked = self._validation[name]
+        return valid, time.monotonic() - checked
+
+    def _probe(self, name: str) -> bool:
+        sf = self.local_sf(name)
+        if not sf:
             return False
-        
         try:
-            sf = self.get_current_sf()
-            if not sf:
-                return False
-            
-            # Intentar una operación simple para validar la sesión
-            sf.describe()
+            # /limits es de las llamadas más baratas; el hook marca la sesión
+            sf.limits()
             return True
         except Exception:
+            self.mark_session(name, False)
+            return False
+
+    def validate_current_session(self, force: bool = False) -> bool:
+        """Valida si la sesión actual es válida, usando la caché mientras no expire el TTL"""
+        if not self.current_session:
+            return False
+        return self.validate_session(self.current_session, force)
+
+    def validate_session(self, name: str, force: bool = False) -> bool:
+        if name not in self.sessions:
             return False
+        if self.agent_available():
+            try:
+                valid = bool(self.agent.request('validate', session=name, force=force))
+                self.mark_session(name, valid)
+                return valid
+            except AgentError:
+                pass
+
+        valid, age = self.session_status(name)
+        if not force and valid is not None and age < self.settings['validation_ttl']:
+            return valid
+        return self._probe(name)
+
+    def validate_in_background(self, name: Optional[str] = None):
+        """Lanza la verificación en un hilo si la caché expiró y no hay otra en curso"""
+        name = name or self.current_session
+        if not name or name not in self.sessions:
+            return
+        if self.agent_available():
+            # El agente valida por su cuenta cuando se le pide el estado
+            return
+        valid, age = self.session_status(name)
+        if valid is not None and age < self.settings['validation_ttl']:
+            return
+        probe = self._probes.get(name)
+        if probe and probe.is_alive():
+            return
+        probe = threading.Thread(target=self._probe, args=(name,), daemon=True)
+        self._probes[name] = probe
+        probe.start()
 
     def refresh_session(self) -> bool:
         """Intenta refrescar la sesión actual"""
@@ -101,6 +507,205 @@ class SalesforceCLI:
         print("La sesión ha expirado. Por favor, haz login nuevamente.")
         return False
 
+class MetadataCache:
+    """Caché en disco del describe global y de los describe por sObject.
+
+    Cada sesión tiene su carpeta en ~/.sf-cli/metadata, identificada por nombre
+    e instancia. Mientras una entrada tenga menos de settings['metadata_max_age']
+    segundos se usa sin red; después se revalida con If-Modified-Since y un 304
+    solo renueva la fecha.
+    """
+    def __init__(self, cli: 'SalesforceCLI'):
+        self.cli = cli
+        self.root = cli.config_dir / 'metadata'
+        self._memory: Dict[Path, Dict[str, Any]] = {}
+
+    def _dir(self, name: str) -> Path:
+        session = self.cli.sessions[name]
+        instance = re.sub(r'[^A-Za-z0-9]+', '_', session.instance_url.split('/services/')[0].split('://')[-1]).strip('_')
+        return self.root / f"{re.sub(r'[^A-Za-z0-9_-]+', '_', name)}__{instance}"
+
+    def _load(self, path: Path) -> Optional[Dict[str, Any]]:
+        if path in self._memory:
+            return self._memory[path]
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._memory[path] = entry
+        return entry
+
+    def _store(self, path: Path, entry: Dict[str, Any]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self._memory[path] = entry
+
+    def _fetch(self, name: Optional[str], resource: str, filename: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        name = name or self.cli.current_session
+        if not name or name not in self.cli.sessions:
+            return None
+        path = self._dir(name) / filename
+        entry = self._load(path)
+        max_age = self.cli.settings.get('metadata_max_age', 86400)
+        if entry and not refresh and time.time() - entry['checked'] < max_age:
+            return entry['data']
+
+        if self.cli.agent_available():
+            try:
+                data = self.cli.agent.request('metadata', session=name, resource=resource, filename=filename, refresh=refresh)
+                # El agente ya guardó la entrada nueva en disco
+                self._memory.pop(path, None)
+                return data
+            except AgentError:
+                pass
+
+        sf = self.cli.local_sf(name)
+        headers = dict(sf.headers)
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        response = sf.session.get(f"{sf.base_url}{resource}", headers=headers)
+        if response.status_code == 304 and entry:
+            entry['checked'] = time.time()
+            self._store(path, entry)
+            return entry['data']
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        entry = {
+            'checked': time.time(),
+            'last_modified': response.headers.get('Last-Modified') or formatdate(usegmt=True),
+            'data': response.json(),
+        }
+        self._store(path, entry)
+        return entry['data']
+
+    def global_describe(self, name: Optional[str] = None, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        return self._fetch(name, 'sobjects/', '_global.json', refresh)
+
+    def describe(self, sobject: str, name: Optional[str] = None, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        canonical = self.canonical_sobject(sobject, name)
+        if not canonical:
+            return None
+        return self._fetch(name, f'sobjects/{canonical}/describe/', f'{canonical}.json', refresh)
+
+    def sobject_names(self, name: Optional[str] = None) -> list:
+        describe = self.global_describe(name) or {}
+        return sorted(sobject['name'] for sobject in describe.get('sobjects', []))
+
+    def canonical_sobject(self, sobject: str, name: Optional[str] = None) -> Optional[str]:
+        """Nombre del sObject con las mayúsculas de la org, o None si no existe"""
+        lookup = {sobject_name.lower(): sobject_name for sobject_name in self.sobject_names(name)}
+        return lookup.get(sobject.strip().lower())
+
+    def fields(self, sobject: str, name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Campos del sObject por nombre: tipo, longitud, referencias y relación"""
+        describe = self.describe(sobject, name) or {}
+        return {
+            field['name']: {
+                'type': field.get('type'),
+                'length': field.get('length'),
+                'referenceTo': field.get('referenceTo', []),
+                'relationshipName': field.get('relationshipName'),
+            }
+            for field in describe.get('fields', [])
+        }
+
+    def completions(self, sobject: Optional[str] = None, name: Optional[str] = None) -> list:
+        words = self.sobject_names(name)
+        if sobject:
+            fields = self.fields(sobject, name)
+            words = words + list(fields) + [f"{field['relationshipName']}." for field in fields.values() if field['relationshipName']]
+        return words
+
+    def unknown_fields(self, sobject: str, field_names: list, name: Optional[str] = None) -> list:
+        """Campos que no existen en el sObject (las rutas de relación solo se validan en su primer tramo)"""
+        fields = self.fields(sobject, name)
+        known = {field.lower() for field in fields}
+        relations = {field['relationshipName'].lower() for field in fields.values() if field['relationshipName']}
+        unknown = []
+        for field in field_names:
+            head, _, rest = field.partition('.')
+            if (rest and head.lower() not in relations) or (not rest and head.lower() not in known):
+                unknown.append(field)
+        return unknown
+
+    def clear(self, name: str):
+        path = self._dir(name)
+        if path.exists():
+            for file in path.iterdir():
+                file.unlink()
+            path.rmdir()
+        self._memory = {key: value for key, value in self._memory.items() if key.parent != path}
+
+def input_with_completion(prompt: str, words) -> str:
+    """input() con autocompletado por tabulador (si hay readline).
+
+    words es una lista o una función que recibe la línea escrita hasta ahora.
+    """
+    if readline is None:
+        return input(prompt)
+    matches = []
+
+    def complete(text, state):
+        if state == 0:
+            vocabulary = words(readline.get_line_buffer()) if callable(words) else words
+            matches[:] = sorted({word for word in vocabulary if word.lower().startswith(text.lower())})
+        return matches[state] if state < len(matches) else None
+
+    previous = readline.get_completer()
+    readline.set_completer(complete)
+    readline.set_completer_delims(" \t\n,()=<>'")
+    readline.parse_and_bind('tab: complete')
+    try:
+        return input(prompt)
+    finally:
+        readline.set_completer(previous)
+
+def check_soql(cli: SalesforceCLI, soql: str) -> bool:
+    """Valida objeto y campos del SELECT contra la caché de metadatos; False si el usuario cancela"""
+    sobject = soql_sobject(soql)
+    if not sobject or not cli.get_current_sf():
+        return True
+    try:
+        if not cli.metadata.canonical_sobject(sobject):
+            problem = f"el objeto '{sobject}' no existe en la org"
+        else:
+            unknown = cli.metadata.unknown_fields(sobject, select_fields(soql) or [])
+            if not unknown:
+                return True
+            problem = f"campos desconocidos en {sobject}: {', '.join(unknown)}"
+    except Exception as e:
+        print(f"⚠ No se pudieron validar los metadatos: {str(e)}")
+        return True
+    print(f"⚠ La consulta no es válida: {problem}")
+    return input("¿Continuar de todas formas? (s/n): ").strip().lower() == 's'
+
+def ask_sobject(cli: SalesforceCLI, prompt: str) -> str:
+    """Pide un sObject con autocompletado y lo normaliza con los metadatos de la org"""
+    def sobjects(line):
+        try:
+            return cli.metadata.sobject_names()
+        except Exception:
+            return []
+
+    sobject = input_with_completion(prompt, sobjects).strip()
+    if not cli.get_current_sf():
+        return sobject
+    try:
+        canonical = cli.metadata.canonical_sobject(sobject)
+    except Exception:
+        return sobject
+    if not canonical:
+        print(f"⚠ '{sobject}' no aparece en los metadatos de la org")
+        return sobject
+    return canonical
+
 class SessionManager:
     def __init__(self, cli: SalesforceCLI):
         self.cli = cli
@@ -140,7 +745,7 @@ class SessionManager:
             try:
                 print(f"Intento {i+1}/{len(trailhead_tokens)}...")
                 
-                sf = Salesforce(
+                sf = salesforce_api.Salesforce(
                     username=username,
                     password=password,
                     security_token=token,
@@ -155,6 +760,7 @@ class SessionManager:
                 )
                 
                 self.cli.sessions[session_name] = session
+                self.cli.invalidate_client(session_name)
                 self.cli.current_session = session_name
                 self.cli.save_config()
                 
@@ -236,7 +842,7 @@ class SessionManager:
             try:
                 print(f"Intento {i+1}/{len(security_tokens)}...")
                 
-                sf = Salesforce(
+                sf = salesforce_api.Salesforce(
                     username=username,
                     password=password,
                     security_token=token,
@@ -252,6 +858,7 @@ class SessionManager:
                 )
                 
                 self.cli.sessions[session_name] = session
+                self.cli.invalidate_client(session_name)
                 self.cli.current_session = session_name
                 self.cli.save_config()
                 
@@ -299,7 +906,9 @@ class SessionManager:
                 session_name = choice
                 
             if session_name in self.cli.sessions:
+                self.cli.metadata.clear(session_name)
                 del self.cli.sessions[session_name]
+                self.cli.invalidate_client(session_name)
                 if self.cli.current_session == session_name:
                     self.cli.current_session = None
                 self.cli.save_config()
@@ -329,6 +938,8 @@ class SessionManager:
                 session_name = choice
                 
             if session_name in self.cli.sessions:
+                if self.cli.current_session and self.cli.current_session != session_name:
+                    self.cli.invalidate_client(self.cli.current_session)
                 self.cli.current_session = session_name
                 self.cli.save_config()
                 session = self.cli.sessions[session_name]
@@ -350,6 +961,186 @@ class SessionManager:
             print(f"{i}. {name} - {session.username}@{session.instance_type}{current_marker}")
             print(f"   URL: {session.instance_url}")
 
+class TemplateError(ValueError):
+    pass
+
+_SF_ID_RE = re.compile(r'^[a-zA-Z0-9]{15}(?:[a-zA-Z0-9]{3})?$')
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*(\w+)\s*\|\s*(\w+)\s*\}\}')
+
+def _escape_string(value) -> str:
+    text = str(value).replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+    return f"'{text}'"
+
+def _escape_id(value) -> str:
+    text = str(value).strip()
+    if not _SF_ID_RE.match(text):
+        raise TemplateError(f"'{text}' no es un Id de Salesforce válido")
+    return text
+
+def _escape_identifier(value) -> str:
+    text = str(value).strip()
+    if not _IDENTIFIER_RE.match(text):
+        raise TemplateError(f"'{text}' no es un nombre de objeto o campo válido")
+    return text
+
+def _escape_date(value) -> str:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return _parse_date_text(str(value).strip())
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text: str) -> str:
+    # En lotes las mismas fechas se repiten en miles de filas
+    for fmt in ('%Y-%m-%d', '%Y%m%d'):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise TemplateError(f"'{text}' no es una fecha válida (YYYY-MM-DD o YYYYMMDD)")
+
+def _escape_int(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    if not re.match(r'^-?\d+$', text):
+        raise TemplateError(f"'{text}' no es un número entero")
+    return text
+
+# Filtros disponibles en las plantillas: {{nombre|filtro}}
+ESCAPERS = {
+    'string': _escape_string,
+    'id': _escape_id,
+    'identifier': _escape_identifier,
+    'date': _escape_date,
+    'int': _escape_int,
+}
+
+class Template:
+    """Plantilla de Apex/SOQL compilada una sola vez.
+
+    Los marcadores {{nombre|filtro}} se resuelven al compilar en una lista de
+    (texto fijo, parámetro, filtro); render solo escapa los valores y une.
+    """
+    def __init__(self, source: str):
+        self.source = source
+        self.parts = []
+        position = 0
+        for match in _PLACEHOLDER_RE.finditer(source):
+            name, escaper = match.groups()
+            if escaper not in ESCAPERS:
+                raise TemplateError(f"Filtro desconocido: {escaper}")
+            self.parts.append((source[position:match.start()], name, ESCAPERS[escaper]))
+            position = match.end()
+        self.tail = source[position:]
+        self.params = list(dict.fromkeys(name for _, name, _ in self.parts))
+
+    def render(self, **params) -> str:
+        out = []
+        for text, name, escape in self.parts:
+            if params.get(name) in (None, ''):
+                raise TemplateError(f"Falta el parámetro '{name}'")
+            try:
+                out.append(text + escape(params[name]))
+            except TemplateError as e:
+                raise TemplateError(f"{name}: {e}") from None
+        out.append(self.tail)
+        return ''.join(out)
+
+TEMPLATES = {name: Template(source) for name, source in {
+    'reset_password': """
+User userToReset = [SELECT Id FROM User WHERE Username = {{username|string}} LIMIT 1];
+System.setPassword(userToReset.Id, {{new_password|string}});
+System.debug('Contraseña restablecida para: ' + {{username|string}});""",
+    'delete_record': """
+{{object_type|identifier}} recordToDelete = [SELECT Id FROM {{object_type|identifier}} WHERE Id = '{{record_id|id}}'];
+delete recordToDelete;
+System.debug('{{object_type|identifier}} eliminado: {{record_id|id}}');""",
+    'replace_advisor': """
+        String ANTIGUO_ADVISOR = '{{old_id|id}}';
+        String NUEVO_ADVISOR = '{{new_id|id}}';
+        Integer REGISTROS_LIMITE = {{limit|int}};
+
+        List<Opportunity> oportunidades = [
+            SELECT Id, Advisor_Pre_Arrival__c
+            FROM Opportunity
+            WHERE Arrival__c >= {{start|date}}
+            AND Arrival__c <= {{end|date}}
+            AND Advisor_Pre_Arrival__c = :ANTIGUO_ADVISOR
+            LIMIT :REGISTROS_LIMITE
+        ];
+
+        for(Opportunity opp : oportunidades) {
+            opp.Advisor_Pre_Arrival__c = NUEVO_ADVISOR;
+        }
+
+        update oportunidades;
+        """,
+    'lead_range': "SELECT Id, Email, Email2__c FROM Lead WHERE CreatedDate >= {{start|date}}T00:00:00Z AND CreatedDate <= {{end|date}}T23:59:59Z",
+    'advisor_opportunities': "SELECT Id, Name, StageName FROM Opportunity WHERE Advisor_Pre_Arrival__c = '{{advisor_id|id}}'",
+    'advisor_opportunity_ids': ("SELECT Id FROM Opportunity WHERE Arrival__c >= {{start|date}} AND Arrival__c <= {{end|date}} "
+                                "AND Advisor_Pre_Arrival__c = '{{old_id|id}}'"),
+}.items()}
+
+# Plantillas de Apex que se pueden generar por lotes desde un archivo
+BATCH_TEMPLATES = ('reset_password', 'delete_record', 'replace_advisor')
+
+def render(name: str, **params) -> str:
+    return TEMPLATES[name].render(**params)
+
+def parse_date_range(text: str) -> tuple:
+    """'YYYYMMDD to YYYYMMDD' (o YYYY-MM-DD) -> (inicio, fin) en ISO"""
+    parts = re.split(r'\s+(?:to|a)\s+|\s*\.\.\s*', text.strip(), flags=re.IGNORECASE)
+    if len(parts) != 2:
+        raise TemplateError(f"Rango de fechas inválido: '{text}' (usa 'YYYYMMDD to YYYYMMDD')")
+    start, end = (_escape_date(part) for part in parts)
+    if start > end:
+        raise TemplateError(f"Rango de fechas inválido: {start} es posterior a {end}")
+    return start, end
+
+def read_parameter_rows(path: str):
+    """Filas de parámetros desde CSV o Excel (primera hoja), con encabezados en minúsculas"""
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise TemplateError("Instala openpyxl para leer archivos Excel")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = [str(cell).strip().lower() if cell is not None else '' for cell in next(rows, [])]
+            for row in rows:
+                if any(cell not in (None, '') for cell in row):
+                    yield dict(zip(header, row))
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield {(key or '').strip().lower(): value for key, value in row.items()}
+
+def render_batch(name: str, rows) -> tuple:
+    """Renderiza una plantilla por fila; cada bloque va entre llaves para aislar sus variables.
+
+    Devuelve (script, bloques generados, [(fila, error)]).
+    """
+    template = TEMPLATES[name]
+    blocks, errors = [], []
+    for number, row in enumerate(rows, 2):
+        if 'date_range' in row and row.get('date_range') and not row.get('start'):
+            try:
+                row['start'], row['end'] = parse_date_range(str(row['date_range']))
+            except TemplateError as e:
+                errors.append((number, str(e)))
+                continue
+        try:
+            blocks.append(f"// Fila {number}\n{{{template.render(**row)}\n}}\n")
+        except TemplateError as e:
+            errors.append((number, str(e)))
+    return '\n'.join(blocks), len(blocks), errors
+
 class UserManager:
     def __init__(self, cli: SalesforceCLI):
         self.cli = cli
@@ -357,29 +1148,303 @@ class UserManager:
     def reset_password(self):
         username = input("Username: ")
         new_password = input("Nueva contraseña: ")
-        soql_code = f"""
-User userToReset = [SELECT Id FROM User WHERE username='{username}' LIMIT 1];
-System.setPassword(userToReset.Id, '{new_password}');
-System.debug('Contraseña restablecida para: {username}');"""
- 
+        try:
+            soql_code = render('reset_password', username=username, new_password=new_password)
+        except TemplateError as e:
+            print(f"❌ {str(e)}")
+            return
+
         print("\nCódigo SOQL generado:")
         print("═"*50)
         print(soql_code)
         print("═"*50)
         save_to_file(soql_code, "password_reset.soql")
 
+class BulkApiError(Exception):
+    pass
+
+def csv_chunks(header: list, rows, max_bytes: int = 100 * 1024 * 1024, max_rows: int = 10000000):
+    """Agrupa filas en CSVs codificados que respetan el límite de carga de Bulk API 2.0"""
+    def encode(row):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(row)
+        return buffer.getvalue().encode('utf-8')
+
+    head = encode(header)
+    parts, size, count = [head], len(head), 0
+    for row in rows:
+        line = encode(row)
+        if count and (size + len(line) > max_bytes or count >= max_rows):
+            yield b''.join(parts), count
+            parts, size, count = [head], len(head), 0
+        parts.append(line)
+        size += len(line)
+        count += 1
+    if count:
+        yield b''.join(parts), count
+
+class BulkJobManager:
+    """Trabajos de Bulk API 2.0: consulta, actualización y borrado masivo"""
+    TERMINAL_STATES = ('JobComplete', 'Failed', 'Aborted')
+
+    def __init__(self, sf: Salesforce, poll_interval: float = 2.0, max_interval: float = 30.0,
+                 workers: int = 3, output_dir: Path = Path("outputs"), timeout: float = 3600.0):
+        self.sf = sf
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.workers = workers
+        self.output_dir = output_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def _request(self, method: str, path: str, **kwargs):
+        headers = dict(self.sf.headers)
+        headers.update(kwargs.pop('headers', {}))
+        response = self.sf.session.request(method, f"{self.sf.base_url}jobs/{path}", headers=headers, **kwargs)
+        if response.status_code >= 300:
+            raise BulkApiError(f"{method} jobs/{path}: {response.status_code} {response.text[:500]}")
+        return response
+
+    def wait(self, job_id: str, kind: str = 'ingest') -> Dict[str, Any]:
+        """Consulta el estado con backoff exponencial hasta que el trabajo termine o venza el timeout"""
+        interval = self.poll_interval
+        deadline = time.monotonic() + self.timeout
+        while True:
+            info = self._request('GET', f"{kind}/{job_id}").json()
+            state = info.get('state')
+            processed = info.get('numberRecordsProcessed', 0)
+            print(f"\r⏳ {job_id}: {state} ({processed} procesados)", end='', flush=True)
+            if state in self.TERMINAL_STATES:
+                print()
+                return info
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print()
+                raise BulkApiError(f"El trabajo {job_id} sigue en {state} tras {self.timeout:.0f}s; "
+                                   f"revisa su estado en Salesforce o abórtalo")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, self.max_interval)
+
+    def ingest(self, sobject: str, operation: str, header: list, rows) -> list:
+        """Sube las filas en uno o más trabajos y devuelve la info final de cada uno"""
+        job_ids = []
+        for body, count in csv_chunks(header, rows):
+            job = self._request('POST', 'ingest', json={
+                'object': sobject,
+                'operation': operation,
+                'contentType': 'CSV',
+                'lineEnding': 'LF',
+            }).json()
+            self._request('PUT', f"ingest/{job['id']}/batches", data=body,
+                          headers={'Content-Type': 'text/csv'})
+            self._request('PATCH', f"ingest/{job['id']}", json={'state': 'UploadComplete'})
+            print(f"✓ Trabajo {job['id']} creado con {count} registros")
+            job_ids.append(job['id'])
+        if not job_ids:
+            print("No hay registros para procesar")
+            return []
+        results = [self.wait(job_id) for job_id in job_ids]
+        self.download_results(job_ids)
+        processed = sum(r.get('numberRecordsProcessed', 0) for r in results)
+        failed = sum(r.get('numberRecordsFailed', 0) for r in results)
+        print(f"✓ Procesados: {processed} | Fallidos: {failed}")
+        return results
+
+    def download_results(self, job_ids: list) -> list:
+        """Descarga exitosos, fallidos y no procesados de todos los trabajos en paralelo"""
+        sets = {'successfulResults': 'exitosos', 'failedResults': 'fallidos', 'unprocessedrecords': 'no_procesados'}
+        tasks = [(job_id, resource, suffix) for job_id in job_ids for resource, suffix in sets.items()]
+
+        def download(task):
+            job_id, resource, suffix = task
+            path = self.output_dir / f"bulk_{job_id}_{suffix}.csv"
+            response = self._request('GET', f"ingest/{job_id}/{resource}/", stream=True)
+            with open(path, 'wb') as f:
+                for block in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(block)
+            return path
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            paths = list(pool.map(download, tasks))
+        print(f"✓ Resultados en: {os.path.abspath(self.output_dir)}")
+        return paths
+
+    def query(self, soql: str, output_path: Optional[Path] = None, page_size: int = 100000) -> Optional[Path]:
+        """Extrae una consulta con un trabajo de Bulk API 2.0 y la escribe a CSV por páginas"""
+        job = self._request('POST', 'query', json={'operation': 'query', 'query': soql}).json()
+        info = self.wait(job['id'], 'query')
+        if info.get('state') != 'JobComplete':
+            print(f"❌ El trabajo terminó en estado {info.get('state')}: {info.get('errorMessage', '')}")
+            return None
+        output_path = output_path or self.output_dir / f"bulk_query_{job['id']}.csv"
+        locator = None
+        rows = 0
+        with open(output_path, 'wb') as f:
+            while True:
+                params = {'maxRecords': page_size}
+                if locator:
+                    params['locator'] = locator
+                response = self._request('GET', f"query/{job['id']}/results", params=params,
+                                         headers={'Accept': 'text/csv'})
+                body = response.content
+                if locator:
+                    # Cada página repite el encabezado
+                    body = body.split(b'\n', 1)[1] if b'\n' in body else b''
+                f.write(body)
+                rows += int(response.headers.get('Sforce-NumberOfRecords', 0))
+                locator = response.headers.get('Sforce-Locator')
+                if not locator or locator == 'null':
+                    break
+        print(f"✓ {rows} registros extraídos: {os.path.abspath(output_path)}")
+        return output_path
+
+class CollectionsExecutor:
+    """Actualiza o elimina registros en lotes de 200 con sObject Collections.
+
+    Varios lotes viajan a la vez en un pool acotado; con allOrNone=false cada
+    registro tiene su propio resultado y los fallos se guardan en un CSV.
+    """
+    BATCH_SIZE = 200
+
+    def __init__(self, sf: Salesforce, workers: int = 4, output_dir: Path = Path("outputs")):
+        self.sf = sf
+        self.workers = workers
+        self.output_dir = output_dir
+
+    def _batches(self, items):
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == self.BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _update_batch(self, sobject: str, records: list) -> list:
+        payload = {
+            'allOrNone': False,
+            'records': [dict(record, attributes={'type': sobject}) for record in records],
+        }
+        return self.sf.restful('composite/sobjects', method='PATCH', json=payload)
+
+    def _delete_batch(self, ids: list) -> list:
+        return self.sf.restful('composite/sobjects', method='DELETE',
+                               params={'ids': ','.join(ids), 'allOrNone': 'false'})
+
+    def _run(self, batches, call, ids_of) -> Dict[str, int]:
+        summary = {'exitosos': 0, 'fallidos': 0}
+        failures = []
+        in_flight = {}
+
+        def collect(future):
+            batch = in_flight.pop(future)
+            try:
+                results = future.result() or []
+            except Exception as e:
+                # Error de todo el lote (sesión, límite, etc.)
+                results = [{'id': record_id, 'success': False, 'errors': [{'message': str(e)}]} for record_id in ids_of(batch)]
+            for record_id, result in zip(ids_of(batch), results):
+                if result.get('success'):
+                    summary['exitosos'] += 1
+                else:
+                    summary['fallidos'] += 1
+                    errors = '; '.join(f"{e.get('statusCode', '')} {e.get('message', '')}".strip() for e in result.get('errors', []))
+                    failures.append((result.get('id') or record_id, errors))
+            print(f"\r⏳ {summary['exitosos']} exitosos | {summary['fallidos']} fallidos", end='', flush=True)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for batch in batches:
+                # Ventana acotada: no se encolan más lotes de los que hay en vuelo
+                while len(in_flight) >= self.workers * 2:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+                in_flight[pool.submit(call, batch)] = batch
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+        print()
+
+        if failures:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            path = self.output_dir / f"collections_fallidos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Id', 'error'])
+                writer.writerows(failures)
+            print(f"⚠ Detalle de fallos: {os.path.abspath(path)}")
+        print(f"✓ Exitosos: {summary['exitosos']} | Fallidos: {summary['fallidos']}")
+        return summary
+
+    def update(self, sobject: str, records) -> Dict[str, int]:
+        """records: dicts con Id y los campos a cambiar"""
+        return self._run(self._batches(records), lambda batch: self._update_batch(sobject, batch),
+                         lambda batch: [record['Id'] for record in batch])
+
+    def delete(self, ids) -> Dict[str, int]:
+        return self._run(self._batches(ids), self._delete_batch, lambda batch: batch)
+
+def read_ids(source: str) -> list:
+    """IDs desde un CSV (columna Id) o una lista separada por comas"""
+    path = Path(source)
+    if path.exists():
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            column = next((c for c in reader.fieldnames or [] if c.lower() == 'id'), None)
+            if column is None:
+                raise ValueError("El CSV debe tener una columna Id")
+            return [row[column].strip() for row in reader if row[column].strip()]
+    return [value.strip() for value in source.split(',') if value.strip()]
+
 class RecordManager:
     def __init__(self, cli: SalesforceCLI):
         self.cli = cli
 
+    def _execution_mode(self) -> str:
+        print("\nModo de ejecución:")
+        print("1. Generar script Apex")
+        print("2. Bulk API 2.0 (volúmenes grandes)")
+        print("3. Ejecutar directamente (sObject Collections, cientos a miles)")
+        return input("Selección (default 1): ").strip() or "1"
+
+    def _sf(self) -> Optional[Salesforce]:
+        sf = self.cli.get_current_sf()
+        if not sf:
+            print("❌ No hay sesión activa")
+            print("💡 Ve a 'Gestión de Sesiones' para hacer login")
+        return sf
+
+    def _bulk(self) -> Optional[BulkJobManager]:
+        sf = self._sf()
+        return BulkJobManager(sf) if sf else None
+
     def delete_record(self):
-        object_type = input("Tipo de objeto (Lead/Account/Opportunity): ")
-        record_id = input("ID del registro: ")
+        mode = self._execution_mode()
+        object_type = ask_sobject(self.cli, "Tipo de objeto (Lead/Account/Opportunity): ")
 
-        soql_code = f"""
-{object_type} recordToDelete = [SELECT Id FROM {object_type} WHERE Id = '{record_id}'];
-delete recordToDelete;
-System.debug('{object_type} eliminado: {record_id}');"""
+        if mode in ("2", "3"):
+            source = input("CSV con columna Id o IDs separados por coma: ").strip()
+            try:
+                ids = read_ids(source)
+                sf = self._sf()
+                if not sf or input(f"¿Eliminar {len(ids)} registros de {object_type}? (s/n): ").strip().lower() != 's':
+                    return
+                if mode == "2":
+                    BulkJobManager(sf).ingest(object_type, 'delete', ['Id'], ([record_id] for record_id in ids))
+                else:
+                    CollectionsExecutor(sf).delete(ids)
+            except Exception as e:
+                print(f"❌ Error eliminando registros: {str(e)}")
+            return
+
+        record_id = input("ID del registro: ")
+        try:
+            soql_code = render('delete_record', object_type=object_type, record_id=record_id)
+        except TemplateError as e:
+            print(f"❌ {str(e)}")
+            return
 
         print("\nCódigo SOQL generado:")
         print("═"*50)
@@ -387,32 +1452,40 @@ System.debug('{object_type} eliminado: {record_id}');"""
         print("═"*50)
         save_to_file(soql_code, "delete_record.soql")
 
+    def _check_advisor_fields(self) -> bool:
+        if not self.cli.get_current_sf():
+            return True
+        try:
+            unknown = self.cli.metadata.unknown_fields('Opportunity', ['Arrival__c', 'Advisor_Pre_Arrival__c'])
+        except Exception:
+            return True
+        if not unknown:
+            return True
+        print(f"⚠ Campos que no existen en Opportunity: {', '.join(unknown)}")
+        return input("¿Continuar de todas formas? (s/n): ").strip().lower() == 's'
+
     def replace_advisor(self):
+        if not self._check_advisor_fields():
+            return
+        mode = self._execution_mode()
         old_id = input("ID antiguo advisor: ")
         new_id = input("ID nuevo advisor: ")
+        if mode == "2":
+            date_range = input("Rango fechas (YYYYMMDD to YYYYMMDD): ")
+            self.bulk_replace_advisor(old_id, new_id, date_range)
+            return
+        if mode == "3":
+            date_range = input("Rango fechas (YYYYMMDD to YYYYMMDD): ")
+            self.direct_replace_advisor(old_id, new_id, date_range)
+            return
         limit = input("Límite registros (default 200): ") or "200"
         date_range = input("Rango fechas (YYYYMMDD to YYYYMMDD): ")
-
-        soql_code = f"""
-        String ANTIGUO_ADVISOR = '{old_id}';
-        String NUEVO_ADVISOR = '{new_id}';
-        Integer REGISTROS_LIMITE = {limit};
-
-        List<Opportunity> oportunidades = [
-            SELECT Id, Advisor_Pre_Arrival__c
-            FROM Opportunity
-            WHERE Arrival__c >= {date_range.split(' to ')[0]}
-            AND Arrival__c <= {date_range.split(' to ')[1]}
-            AND Advisor_Pre_Arrival__c = :ANTIGUO_ADVISOR
-            LIMIT :REGISTROS_LIMITE
-        ];
-
-        for(Opportunity opp : oportunidades) {{
-            opp.Advisor_Pre_Arrival__c = NUEVO_ADVISOR;
-        }}
-
-        update oportunidades;
-        """
+        try:
+            start, end = parse_date_range(date_range)
+            soql_code = render('replace_advisor', old_id=old_id, new_id=new_id, limit=limit, start=start, end=end)
+        except TemplateError as e:
+            print(f"❌ {str(e)}")
+            return
 
         print("\nCódigo SOQL generado:")
         print("═"*50)
@@ -420,6 +1493,291 @@ System.debug('{object_type} eliminado: {record_id}');"""
         print("═"*50)
         save_to_file(soql_code, "replace_advisor.soql")
 
+    def batch_script(self):
+        """Genera un solo script de Apex con un bloque por fila de un CSV/Excel de parámetros"""
+        print("\nPlantillas disponibles:")
+        for i, name in enumerate(BATCH_TEMPLATES, 1):
+            print(f"{i}. {name} (columnas: {', '.join(TEMPLATES[name].params)})")
+        choice = input("Selección: ").strip()
+        if not (choice.isdigit() and 1 <= int(choice) <= len(BATCH_TEMPLATES)):
+            print("Opción inválida")
+            return
+        name = BATCH_TEMPLATES[int(choice) - 1]
+        if name == 'replace_advisor':
+            print("💡 Las fechas pueden ir en columnas start/end o en una columna date_range")
+        path = input("Archivo de parámetros (CSV/Excel): ").strip().strip('"')
+        if not os.path.exists(path):
+            print(f"❌ No existe el archivo: {path}")
+            return
+
+        start = time.perf_counter()
+        try:
+            script, blocks, errors = render_batch(name, read_parameter_rows(path))
+        except Exception as e:
+            print(f"❌ Error leyendo parámetros: {str(e)}")
+            return
+        for row, error in errors[:20]:
+            print(f"⚠ Fila {row}: {error}")
+        if len(errors) > 20:
+            print(f"⚠ ... y {len(errors) - 20} filas más con errores")
+        if not blocks:
+            print("❌ No se generó ningún bloque")
+            return
+        print(f"✓ {blocks} bloques generados en {time.perf_counter() - start:.2f}s ({len(errors)} filas omitidas)")
+        if blocks > 100:
+            print("💡 Apex anónimo admite 100 consultas SOQL por transacción: ejecuta el script por partes")
+        save_to_file(script, f"{name}_lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.apex")
+
+    def bulk_replace_advisor(self, old_id: str, new_id: str, date_range: str):
+        """Sin límite de registros: extrae los Id con Bulk API y los actualiza en trabajos de ingesta"""
+        bulk = self._bulk()
+        if not bulk:
+            return
+        try:
+            start, end = parse_date_range(date_range)
+            soql = render('advisor_opportunity_ids', old_id=old_id, start=start, end=end)
+            ids_file = bulk.query(soql)
+            if not ids_file:
+                return
+            ids = read_ids(str(ids_file))
+            if input(f"¿Reasignar {len(ids)} oportunidades a {new_id}? (s/n): ").strip().lower() != 's':
+                return
+            bulk.ingest('Opportunity', 'update', ['Id', 'Advisor_Pre_Arrival__c'],
+                        ([record_id, new_id] for record_id in ids))
+        except Exception as e:
+            print(f"❌ Error en Bulk API: {str(e)}")
+
+    def direct_replace_advisor(self, old_id: str, new_id: str, date_range: str):
+        """Consulta los Id por REST y aplica el cambio con sObject Collections desde la CLI"""
+        sf = self._sf()
+        if not sf:
+            return
+        try:
+            start, end = parse_date_range(date_range)
+            soql = render('advisor_opportunity_ids', old_id=old_id, start=start, end=end)
+            ids = [record['Id'] for page in iter_query_pages(sf, soql) for record in page.get('records', [])]
+            if input(f"¿Reasignar {len(ids)} oportunidades a {new_id}? (s/n): ").strip().lower() != 's':
+                return
+            CollectionsExecutor(sf).update('Opportunity', ({'Id': record_id, 'Advisor_Pre_Arrival__c': new_id} for record_id in ids))
+        except Exception as e:
+            print(f"❌ Error actualizando registros: {str(e)}")
+
+_AGGREGATE_RE = re.compile(r'\b(COUNT|SUM|AVG|MIN|MAX|COUNT_DISTINCT|FORMAT|toLabel|convertCurrency)\s*\(', re.IGNORECASE)
+
+def soql_sobject(soql: str) -> Optional[str]:
+    """sObject de la consulta principal (el primer FROM fuera de subconsultas)"""
+    depth = 0
+    for match in re.finditer(r'[()]|\bFROM\s+(\w+)', soql, re.IGNORECASE):
+        token = match.group(0)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0:
+            return match.group(1)
+    return None
+
+def select_fields(soql: str) -> Optional[list]:
+    """Campos del SELECT en el orden de la consulta (None si hay subconsultas o agregados)"""
+    match = re.match(r'\s*SELECT\s+(.*?)\s+FROM\s', soql, re.IGNORECASE | re.DOTALL)
+    if not match or '(' in match.group(1) or _AGGREGATE_RE.search(match.group(1)):
+        return None
+    return [field.strip() for field in match.group(1).split(',') if field.strip()]
+
+def flatten_record(record: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """Aplana relaciones (Owner.Name) y quita los 'attributes' de la API"""
+    flat = {}
+    for key, value in record.items():
+        if key == 'attributes':
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and 'records' in value:
+            # Subconsulta: se conserva como JSON en una sola celda
+            flat[name] = json.dumps([strip_attributes(r) for r in value['records']], ensure_ascii=False)
+        elif isinstance(value, dict):
+            flat.update(flatten_record(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+def strip_attributes(record: Any) -> Any:
+    if isinstance(record, dict):
+        return {k: strip_attributes(v) for k, v in record.items() if k != 'attributes'}
+    if isinstance(record, list):
+        return [strip_attributes(v) for v in record]
+    return record
+
+class _FlatRecordSink:
+    """Base para salidas tabulares: columnas fijas desde la primera página"""
+    def __init__(self, fields: Optional[list]):
+        self.fields = fields
+        self.lookup = None
+
+    def rows(self, records: list) -> list:
+        rows = [flatten_record(r) for r in records]
+        if self.lookup is None:
+            seen = list(dict.fromkeys(k for row in rows for k in row))
+            if self.fields is None:
+                # Sin lista de campos confiable: encabezado a partir de la primera página
+                self.fields = seen
+            else:
+                # La API devuelve los nombres con su mayúscula real, la consulta puede no tenerla
+                api_names = {k.lower(): k for k in seen}
+                self.fields = [api_names.get(f.lower(), f) for f in self.fields]
+            self.lookup = {f.lower(): f for f in self.fields}
+        return [{self.lookup[k.lower()]: v for k, v in row.items() if k.lower() in self.lookup} for row in rows]
+
+class CsvRecordSink(_FlatRecordSink):
+    def __init__(self, path: Path, fields: Optional[list]):
+        super().__init__(fields)
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = None
+
+    def write(self, records: list):
+        rows = self.rows(records)
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fields)
+            self.writer.writeheader()
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class JsonlRecordSink:
+    def __init__(self, path: Path, fields: Optional[list]):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, records: list):
+        self.file.writelines(json.dumps(strip_attributes(r), ensure_ascii=False) + '\n' for r in records)
+
+    def close(self):
+        self.file.close()
+
+# Tipos del describe que tienen equivalente exacto en Arrow; el resto va como texto
+SF_ARROW_TYPES = {
+    'boolean': 'bool_',
+    'int': 'int64',
+    'double': 'float64',
+    'currency': 'float64',
+    'percent': 'float64',
+}
+
+class ParquetRecordSink(_FlatRecordSink):
+    """Parquet por páginas con el esquema tomado del describe del sObject.
+
+    Los campos fuera del describe (relaciones, agregados) se infieren: una columna
+    sin valores en la primera página queda como null, y si una página posterior
+    trae otro tipo el archivo se reescribe con el esquema ampliado en lugar de
+    abortar la consulta a la mitad.
+    """
+    def __init__(self, path: Path, fields: Optional[list], field_types: Optional[Dict[str, str]] = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        super().__init__(fields)
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.writer = None
+        self.schema = None
+        self.known = {name.lower(): getattr(pa, SF_ARROW_TYPES.get(kind, 'string'))()
+                      for name, kind in (field_types or {}).items()}
+
+    def _column(self, name: str, rows: list):
+        values = [row.get(name) for row in rows]
+        kind = self.known.get(name.lower())
+        if kind is not None:
+            try:
+                return self.pa.array(values, type=kind)
+            except (self.pa.ArrowInvalid, self.pa.ArrowTypeError):
+                pass
+        array = self.pa.array(values)
+        if self.pa.types.is_integer(array.type):
+            # Los números de la API pueden llegar como enteros o decimales
+            array = array.cast(self.pa.float64())
+        return array
+
+    def _merge(self, columns: Dict[str, Any]):
+        pa = self.pa
+        fields = []
+        for field in self.schema:
+            old, new = field.type, columns[field.name].type
+            if pa.types.is_null(new) or new == old:
+                kind = old
+            elif pa.types.is_null(old):
+                kind = new
+            elif (pa.types.is_integer(old) or pa.types.is_floating(old)) and (pa.types.is_integer(new) or pa.types.is_floating(new)):
+                kind = pa.float64()
+            else:
+                kind = pa.string()
+            fields.append(pa.field(field.name, kind))
+        return pa.schema(fields)
+
+    def _promote(self, schema):
+        # Parquet no permite cambiar el esquema de un archivo abierto: se reescribe lo ya escrito
+        self.writer.close()
+        written = self.pq.read_table(self.path).cast(schema)
+        self.writer = self.pq.ParquetWriter(self.path, schema)
+        self.writer.write_table(written)
+        self.schema = schema
+
+    def write(self, records: list):
+        rows = self.rows(records)
+        columns = {name: self._column(name, rows) for name in self.fields}
+        if self.writer is None:
+            self.schema = self.pa.schema([self.pa.field(name, column.type) for name, column in columns.items()])
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        else:
+            schema = self._merge(columns)
+            if not schema.equals(self.schema):
+                self._promote(schema)
+        self.writer.write_table(self.pa.table([columns[f.name].cast(f.type) for f in self.schema], schema=self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+RECORD_SINKS = {'csv': CsvRecordSink, 'jsonl': JsonlRecordSink, 'parquet': ParquetRecordSink}
+
+def iter_query_pages(sf: Salesforce, soql: str, include_deleted: bool = False):
+    """Genera cada página de resultados siguiendo nextRecordsUrl bajo demanda"""
+    result = sf.query(soql, include_deleted=include_deleted)
+    yield result
+    while not result.get('done', True) and result.get('nextRecordsUrl'):
+        result = sf.query_more(result['nextRecordsUrl'], identifier_is_url=True)
+        yield result
+
+def explain_query(sf: Salesforce, soql: str) -> list:
+    """Planes de ejecución del optimizador (recurso query?explain=), del más barato al más caro"""
+    plans = sf.restful('query/', params={'explain': soql}).get('plans', [])
+    return sorted(plans, key=lambda plan: plan.get('relativeCost', 0))
+
+def is_selective(plans: list) -> bool:
+    # Con costo relativo mayor a 1 Salesforce considera que el filtro no es selectivo
+    return bool(plans) and plans[0].get('relativeCost', 0) <= 1
+
+def print_plans(plans: list):
+    print("\n🧭 Plan de ejecución:")
+    for i, plan in enumerate(plans, 1):
+        marker = "→" if i == 1 else " "
+        fields = ', '.join(plan.get('fields', [])) or '-'
+        print(f" {marker} {plan.get('leadingOperationType', '?'):<10} costo {plan.get('relativeCost', 0):.2f} | "
+              f"{plan.get('cardinality', '?')} de {plan.get('sobjectCardinality', '?')} filas | campos: {fields}")
+    for plan in plans[:1]:
+        for note in plan.get('notes', []):
+            fields = f" ({', '.join(note['fields'])})" if note.get('fields') else ''
+            print(f"   ℹ {note.get('description', '')}{fields}")
+
+def date_windows(start: str, end: str, days: int) -> list:
+    """Divide [start, end] (YYYY-MM-DD) en ventanas consecutivas de days días"""
+    first = datetime.strptime(start, '%Y-%m-%d').date()
+    last = datetime.strptime(end, '%Y-%m-%d').date()
+    windows = []
+    while first <= last:
+        window_end = min(first + timedelta(days=days - 1), last)
+        windows.append((first.isoformat(), window_end.isoformat()))
+        first = window_end + timedelta(days=1)
+    return windows
+
 class QueryManager:
     def __init__(self, cli: SalesforceCLI):
         self.cli = cli
@@ -431,15 +1789,26 @@ class QueryManager:
         print("3. Personalizado")
         choice = input("Selección: ")
 
+        make_windows = None
         if choice == "1":
             start_date = input("Fecha inicio (YYYY-MM-DD): ")
             end_date = input("Fecha fin (YYYY-MM-DD): ")
-            soql = f"SELECT Id, Email, Email2__c FROM Lead WHERE CreatedDate >= {start_date}T00:00:00Z AND CreatedDate <= {end_date}T23:59:59Z"
+            try:
+                start_date, end_date = parse_date_range(f"{start_date} to {end_date}")
+            except TemplateError as e:
+                print(f"❌ {str(e)}")
+                return
+            soql = self.lead_range_soql(start_date, end_date)
+            make_windows = partial(self.lead_range_windows, start_date, end_date)
         elif choice == "2":
             advisor_id = input("ID del advisor: ")
-            soql = f"SELECT Id, Name, StageName FROM Opportunity WHERE Advisor_Pre_Arrival__c = '{advisor_id}'"
+            try:
+                soql = render('advisor_opportunities', advisor_id=advisor_id)
+            except TemplateError as e:
+                print(f"❌ {str(e)}")
+                return
         else:
-            soql = input("Ingresa tu consulta SOQL: ")
+            soql = input_with_completion("Ingresa tu consulta SOQL: ", self._soql_words)
 
         print("\nConsulta generada:")
         print("═"*50)
@@ -447,6 +1816,229 @@ class QueryManager:
         print("═"*50)
         save_to_file(soql, "custom_query.soql")
 
+        if input("\n¿Ejecutar la consulta ahora? (s/n): ").strip().lower() != 's' or not check_soql(self.cli, soql):
+            return
+        soqls = self.preflight(soql, make_windows)
+        if not soqls:
+            return
+        print("1. REST paginado (csv/jsonl/parquet)")
+        print("2. Bulk API 2.0 (csv, extracciones grandes)")
+        if (input("Motor (default 1): ").strip() or "1") == "2":
+            for window_soql in soqls:
+                self.execute_bulk_query(window_soql)
+        else:
+            fmt = input("Formato de salida (csv/jsonl/parquet, default csv): ").strip().lower() or "csv"
+            self.execute_query(soqls if len(soqls) > 1 else soql, fmt)
+
+    def explain(self):
+        """Muestra el plan de ejecución de una consulta sin ejecutarla"""
+        sf = self.cli.get_current_sf()
+        if not sf:
+            print("❌ No hay sesión activa")
+            return
+        soql = input_with_completion("Consulta SOQL: ", self._soql_words)
+        try:
+            plans = explain_query(sf, soql)
+        except Exception as e:
+            print(f"❌ Error obteniendo el plan: {str(e)}")
+            return
+        print_plans(plans)
+        print("✅ Consulta selectiva" if is_selective(plans) else "⚠ Consulta no selectiva")
+
+    @staticmethod
+    def lead_range_soql(start_date: str, end_date: str) -> str:
+        return render('lead_range', start=start_date, end=end_date)
+
+    def lead_range_windows(self, start_date: str, end_date: str, days: int) -> list:
+        """La consulta de leads partida en ventanas de `days` días"""
+        return [self.lead_range_soql(start, end) for start, end in date_windows(start_date, end_date, days)]
+
+    def preflight(self, soql: str, windows=None) -> Optional[list]:
+        """Revisa el plan antes de ejecutar; devuelve las consultas a correr o None si se cancela.
+
+        windows(días) reescribe la consulta en ventanas de fechas más selectivas.
+        La política (settings.explain_policy) es 'warn', 'refuse' u 'off'.
+        """
+        policy = self.cli.settings.get('explain_policy', 'warn')
+        sf = self.cli.get_current_sf()
+        if policy == 'off' or not sf:
+            return [soql]
+        try:
+            plans = explain_query(sf, soql)
+        except Exception as e:
+            print(f"⚠ No se pudo obtener el plan de ejecución: {str(e)}")
+            return [soql]
+        print_plans(plans)
+        if is_selective(plans):
+            return [soql]
+
+        soqls = [soql]
+        cost = plans[0].get('relativeCost', 0) if plans else 0
+        print(f"⚠ La consulta no es selectiva (costo {cost:.2f}): puede recorrer toda la tabla y agotar el tiempo")
+        if windows:
+            days = input("¿Dividir el rango de fechas en ventanas? Días por ventana (Enter = 7, n = no): ").strip().lower()
+            if days != 'n':
+                soqls = windows(int(days) if days.isdigit() and int(days) > 0 else 7)
+                try:
+                    plans = explain_query(sf, soqls[0])
+                except Exception as e:
+                    print(f"⚠ No se pudo obtener el plan de ejecución: {str(e)}")
+                    return soqls
+                print(f"\n{len(soqls)} ventanas; plan de la primera:")
+                print_plans(plans)
+                if is_selective(plans):
+                    return soqls
+
+        if policy == 'refuse':
+            print("❌ Consulta rechazada por no ser selectiva (settings.explain_policy = refuse)")
+            return None
+        if input("¿Ejecutar de todas formas? (s/n): ").strip().lower() != 's':
+            return None
+        return soqls
+
+    def _soql_words(self, line: str) -> list:
+        """Objetos de la org y, cuando ya hay un FROM, los campos de ese objeto"""
+        if not self.cli.get_current_sf():
+            return []
+        try:
+            return self.cli.metadata.completions(soql_sobject(line))
+        except Exception:
+            return []
+
+    def execute_bulk_query(self, soql: str) -> Optional[Path]:
+        sf = self.cli.get_current_sf()
+        if not sf:
+            print("❌ No hay sesión activa")
+            return None
+        try:
+            return BulkJobManager(sf).query(soql)
+        except Exception as e:
+            print(f"❌ Error en Bulk API: {str(e)}")
+            return None
+
+    def field_types(self, soql: str) -> Dict[str, str]:
+        """Tipo del describe de cada campo del sObject de la consulta ({} si no se puede obtener)"""
+        sobject = soql_sobject(soql)
+        if not sobject:
+            return {}
+        try:
+            return {name: field['type'] for name, field in self.cli.metadata.fields(sobject).items()}
+        except Exception as e:
+            print(f"⚠ Sin metadatos de {sobject}, los tipos se infieren de los datos: {str(e)}")
+            return {}
+
+    def execute_query(self, soql, fmt: str = 'csv', output_path: Optional[Path] = None,
+                      include_deleted: bool = False) -> Optional[Path]:
+        """Ejecuta la consulta (o una lista de ventanas de la misma consulta) y escribe cada página al archivo en cuanto llega"""
+        soqls = [soql] if isinstance(soql, str) else list(soql)
+        if fmt not in RECORD_SINKS:
+            print(f"Formato no soportado: {fmt}")
+            return None
+        sf = self.cli.get_current_sf()
+        if not sf:
+            print("❌ No hay sesión activa")
+            return None
+        if output_path is None:
+            output_dir = Path("outputs")
+            output_dir.mkdir(parents=True, exist_ok=True)
+            output_path = output_dir / f"query_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+        options = {'field_types': self.field_types(soqls[0])} if fmt == 'parquet' else {}
+        try:
+            sink = RECORD_SINKS[fmt](output_path, select_fields(soqls[0]), **options)
+        except ImportError:
+            print("❌ Instala pyarrow para exportar a Parquet")
+            return None
+        rows = 0
+        total = 0
+        start = time.perf_counter()
+        try:
+            for window in soqls:
+                for i, page in enumerate(iter_query_pages(sf, window, include_deleted)):
+                    if i == 0:
+                        total += page.get('totalSize', 0)
+                    records = page.get('records', [])
+                    if records:
+                        sink.write(records)
+                    rows += len(records)
+                    elapsed = time.perf_counter() - start
+                    print(f"\r⏳ {rows}/{total} filas | {rows / elapsed if elapsed else 0:,.0f} filas/s", end='', flush=True)
+            print()
+        except Exception as e:
+            print(f"\n❌ Error ejecutando consulta: {str(e)}")
+            return None
+        finally:
+            sink.close()
+        print(f"✓ {rows} filas en {time.perf_counter() - start:.1f}s")
+        print(f"✓ Resultado guardado: {os.path.abspath(output_path)}")
+        return output_path
+
+class MultiOrgExecutor:
+    """Ejecuta la misma operación contra varias sesiones guardadas a la vez.
+
+    Cada sesión usa su propio cliente cacheado; los resultados vuelven
+    etiquetados con el nombre de la sesión, incluidos los errores.
+    """
+    def __init__(self, cli: SalesforceCLI, workers: int = 8):
+        self.cli = cli
+        self.workers = workers
+
+    def run(self, names: list, operation) -> list:
+        """operation(name, sf) -> resultado; devuelve [{'session', 'result', 'error', 'seconds'}] en el orden de names"""
+        def task(name):
+            start = time.perf_counter()
+            try:
+                sf = self.cli.get_sf(name)
+                if not sf:
+                    raise ValueError("sesión no encontrada o expirada")
+                result, error = operation(name, sf), None
+            except Exception as e:
+                result, error = None, str(e)
+            return {'session': name, 'result': result, 'error': error, 'seconds': time.perf_counter() - start}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(names)))) as pool:
+            return list(pool.map(task, names))
+
+    def query(self, names: list, soql: str) -> list:
+        def operation(name, sf):
+            total, records = 0, []
+            for page in iter_query_pages(sf, soql):
+                total = page.get('totalSize', total)
+                records.extend(dict(flatten_record(record), session=name) for record in page.get('records', []))
+            return {'totalSize': total, 'records': records}
+        return self.run(names, operation)
+
+    def describe(self, names: list) -> list:
+        def operation(name, sf):
+            describe = self.cli.metadata.global_describe(name) or {}
+            sobjects = describe.get('sobjects', [])
+            return {'sobjects': len(sobjects), 'custom': sum(1 for sobject in sobjects if sobject.get('custom'))}
+        return self.run(names, operation)
+
+    def limits(self, names: list) -> list:
+        def operation(name, sf):
+            daily = sf.limits().get('DailyApiRequests', {})
+            return {'max': daily.get('Max'), 'remaining': daily.get('Remaining')}
+        return self.run(names, operation)
+
+def choose_sessions(cli: SalesforceCLI) -> list:
+    """Lista las sesiones y devuelve las elegidas (Enter = todas)"""
+    names = list(cli.sessions.keys())
+    for i, name in enumerate(names, 1):
+        session = cli.sessions[name]
+        print(f"{i}. {name} - {session.username}@{session.instance_type}")
+    choice = input("Sesiones (números separados por coma, Enter = todas): ").strip()
+    if not choice:
+        return names
+    selected = []
+    for part in choice.split(','):
+        part = part.strip()
+        if part.isdigit() and 1 <= int(part) <= len(names):
+            selected.append(names[int(part) - 1])
+        elif part in cli.sessions:
+            selected.append(part)
+    return list(dict.fromkeys(selected))
+
 class OrganizationManager:
     def __init__(self, cli: SalesforceCLI):
         self.cli = cli
@@ -464,12 +2056,7 @@ class OrganizationManager:
             return
         
         try:
-            sf = self.cli.get_current_sf()
-            if not sf:
-                print("Error: No se pudo obtener la sesión de Salesforce")
-                return
-
-            org_info = sf.describe()
+            org_info = self.cli.metadata.global_describe()
             if not org_info:
                 print("Error: No se pudo obtener información de la organización")
                 return
@@ -487,6 +2074,97 @@ class OrganizationManager:
             print(f"❌ Error obteniendo información: {str(e)}")
             print("💡 La sesión puede haber expirado. Intenta refrescar la sesión.")
 
+    def refresh_metadata(self):
+        """Descarta la caché de metadatos de la sesión y vuelve a descargar el describe global"""
+        if not self.cli.current_session:
+            print("❌ No hay sesión activa")
+            return
+        try:
+            self.cli.metadata.clear(self.cli.current_session)
+            print(f"✓ {len(self.cli.metadata.sobject_names())} objetos en caché")
+        except Exception as e:
+            print(f"❌ Error refrescando metadatos: {str(e)}")
+
+    def multi_org(self):
+        """Consulta, describe o límites en varias organizaciones en paralelo"""
+        if not self.cli.sessions:
+            print("No hay sesiones guardadas")
+            return
+        print("\nOperación:")
+        print("1. Consulta SOQL")
+        print("2. Describe (objetos)")
+        print("3. Límites de API diarios")
+        operation = input("Selección: ").strip()
+        if operation not in ("1", "2", "3"):
+            print("Opción inválida")
+            return
+        soql = input("Consulta SOQL: ").strip() if operation == "1" else None
+        names = choose_sessions(self.cli)
+        if not names:
+            print("Selección inválida")
+            return
+
+        executor = MultiOrgExecutor(self.cli)
+        start = time.perf_counter()
+        if operation == "1":
+            results = executor.query(names, soql)
+        elif operation == "2":
+            results = executor.describe(names)
+        else:
+            results = executor.limits(names)
+
+        print("\n" + "═" * 60)
+        for item in results:
+            if item['error']:
+                print(f"❌ {item['session']}: {item['error']}")
+                continue
+            result = item['result']
+            if operation == "1":
+                detail = f"{result['totalSize']} registros"
+            elif operation == "2":
+                detail = f"{result['sobjects']} objetos ({result['custom']} personalizados)"
+            else:
+                detail = f"{result['remaining']}/{result['max']} llamadas disponibles"
+            print(f"✓ {item['session']}: {detail} ({item['seconds']:.1f}s)")
+        print("═" * 60)
+        print(f"⏱ {len(names)} sesiones en {time.perf_counter() - start:.1f}s")
+
+        records = [record for item in results if item['result'] and operation == "1" for record in item['result']['records']]
+        if records:
+            output_dir = Path("outputs")
+            output_dir.mkdir(parents=True, exist_ok=True)
+            output_path = output_dir / f"multiorg_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            fields = ['session'] + [key for key in dict.fromkeys(k for record in records for k in record) if key != 'session']
+            with open(output_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(records)
+            print(f"✓ Registros combinados: {os.path.abspath(output_path)}")
+
+    def show_api_stats(self):
+        """Llamadas de esta ejecución por sesión: latencias, bytes y consumo diario de API"""
+        if self.cli.agent_available():
+            print("💡 Las llamadas enviadas al agente se ven con: python sf-cli.py agent status")
+        summary = self.cli.stats.summary()
+        if not summary:
+            print("Todavía no se ha hecho ninguna llamada a la API")
+            return
+        print("\n📈 Estadísticas de API (esta ejecución)")
+        print("═" * 60)
+        for name, data in summary.items():
+            remaining = f"{data['api_remaining']}/{data['api_max']}" if data['api_remaining'] is not None else "N/A"
+            print(f"🔗 {name}: {data['calls']} llamadas | p50 {data['p50'] * 1000:.0f} ms | p95 {data['p95'] * 1000:.0f} ms")
+            print(f"   Recibido: {data['bytes_received'] / 1024:,.1f} KB | Enviado: {data['bytes_sent'] / 1024:,.1f} KB | API diaria restante: {remaining}")
+            top = sorted(data['endpoints'].items(), key=lambda item: item[1]['calls'], reverse=True)[:10]
+            for endpoint, values in top:
+                print(f"   {values['calls']:>5}  {endpoint}  (p95 {values['p95'] * 1000:.0f} ms)")
+        print("═" * 60)
+
+        choice = input("Exportar: 1. JSON  2. Prometheus  (Enter = no): ").strip()
+        if choice in ("1", "2"):
+            content, extension = (self.cli.stats.to_json(), 'json') if choice == "1" else (self.cli.stats.to_prometheus(), 'prom')
+            save_to_file(content, f"api_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+
     def open_browser(self):
         if not self.cli.current_session:
             print("❌ No hay sesión activa")
@@ -509,7 +2187,7 @@ class OrganizationManager:
         
         print(f"🔍 Probando conexión a '{self.cli.current_session}'...")
         
-        if self.cli.validate_current_session():
+        if self.cli.validate_current_session(force=True):
             print("✅ Conexión exitosa")
             return True
         else:
@@ -543,9 +2221,13 @@ def show_current_session(cli: SalesforceCLI):
         session = cli.sessions[cli.current_session]
         print(f"🔗 Sesión activa: {cli.current_session} ({session.username}@{session.instance_type})")
         
-        # Validar la sesión
-        if cli.validate_current_session():
-            print("✅ Conexión válida")
+        # Estado en caché; la verificación real corre en segundo plano
+        cli.validate_in_background()
+        valid, age = cli.session_status()
+        if valid is None:
+            print("⏳ Verificando conexión...")
+        elif valid:
+            print(f"✅ Conexión válida (verificada hace {age:.0f}s)")
         else:
             print("⚠️  Sesión expirada - Considera refrescar")
     else:
@@ -589,17 +2271,22 @@ def print_submenu(menu_type: str):
         print("\n=== Gestión de Registros ===")
         print("1. Eliminar registro")
         print("2. Reemplazar Advisor")
-        print("3. Volver al menú principal")
+        print("3. Generar script por lotes (CSV/Excel)")
+        print("4. Volver al menú principal")
     elif menu_type == "consultas":
         print("\n=== Consultas SOQL ===")
         print("1. Ejecutar SOQL personalizado")
-        print("2. Volver al menú principal")
+        print("2. Ver plan de ejecución (explain)")
+        print("3. Volver al menú principal")
     elif menu_type == "organizacion":
         print("\n=== Información de Organización ===")
         print("1. Ver organización")
         print("2. Abrir navegador")
         print("3. Probar conexión")
-        print("4. Volver al menú principal")
+        print("4. Refrescar metadatos")
+        print("5. Varias organizaciones (consulta, describe, límites)")
+        print("6. Estadísticas de API")
+        print("7. Volver al menú principal")
 
 def save_to_file(content: str, filename: str):
     output_dir = Path("outputs")
@@ -614,14 +2301,280 @@ def save_to_file(content: str, filename: str):
     except Exception as e:
         print(f"Error guardando archivo: {str(e)}")
 
-def main():
+_METADATA_RESOURCE_RE = re.compile(r'^sobjects/(?:[A-Za-z0-9_]+/describe/)?$')
+_METADATA_FILE_RE = re.compile(r'^[A-Za-z0-9_]+\.json$')
+
+class SessionAgent:
+    """Proceso local que mantiene clientes autenticados, validación y metadatos de todas las sesiones.
+
+    Escucha en ~/.sf-cli/agent.sock (solo accesible por el usuario) con un
+    protocolo de líneas JSON: cada petición es {"op": ..., ...} y cada
+    respuesta {"ok": true, "result": ...} o {"ok": false, "error": ...}.
+    Antes de cada petición revisa si config.json cambió (login o logout desde
+    otra terminal) y descarta los clientes de las sesiones afectadas.
+    """
+    def __init__(self, cli: SalesforceCLI, socket_path: Optional[Path] = None):
+        self.cli = cli
+        self.socket_path = Path(socket_path or cli.config_dir / 'agent.sock')
+        self.started = time.time()
+        self._config_mtime = self._mtime()
+        self._config_lock = threading.Lock()
+        self.server = None
+        self.stopping = False
+        self.handlers = {
+            'ping': self.op_ping,
+            'status': self.op_status,
+            'session_status': self.op_session_status,
+            'validate': self.op_validate,
+            'call': self.op_call,
+            'metadata': self.op_metadata,
+            'reload': self.op_reload,
+            'stop': self.op_stop,
+        }
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return self.cli.config_file.stat().st_mtime
+        except OSError:
+            return None
+
+    def _sync_config(self):
+        with self._config_lock:
+            mtime = self._mtime()
+            if mtime != self._config_mtime:
+                self._config_mtime = mtime
+                self.cli.reload_config()
+
+    def _session(self, params: Dict[str, Any]) -> str:
+        name = params.get('session')
+        if name not in self.cli.sessions:
+            raise ValueError(f"Sesión '{name}' no encontrada")
+        return name
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = self.handlers.get(request.get('op'))
+        if handler is None:
+            return {'ok': False, 'error': f"Operación desconocida: {request.get('op')}"}
+        try:
+            self._sync_config()
+            return {'ok': True, 'result': handler(request)}
+        except Exception as e:
+            return {'ok': False, 'error': str(e), 'type': type(e).__name__}
+
+    # --- operaciones ---
+    def op_ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started}
+
+    def op_status(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        stats = self.cli.stats.summary()
+        sessions = {}
+        for name, session in self.cli.sessions.items():
+            valid, age = self.cli.session_status(name)
+            sessions[name] = {
+                'username': session.username,
+                'valid': valid,
+                'age': age,
+                'client': name in self.cli._clients,
+                'calls': stats.get(name, {}).get('calls', 0),
+                'p95': stats.get(name, {}).get('p95'),
+            }
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started,
+                'socket': str(self.socket_path), 'sessions': sessions}
+
+    def op_session_status(self, params: Dict[str, Any]) -> list:
+        name = self._session(params)
+        self.cli.validate_in_background(name)
+        return list(self.cli.session_status(name))
+
+    def op_validate(self, params: Dict[str, Any]) -> bool:
+        return self.cli.validate_session(self._session(params), bool(params.get('force')))
+
+    def op_call(self, params: Dict[str, Any]) -> Any:
+        method = params.get('method')
+        if method not in RemoteSalesforce.REMOTE_METHODS:
+            raise ValueError(f"Método no permitido: {method}")
+        name = self._session(params)
+        sf = self.cli.local_sf(name)
+        if sf is None:
+            raise ValueError(f"La sesión '{name}' expiró; vuelve a hacer login")
+        return getattr(sf, method)(*params.get('args', []), **params.get('kwargs', {}))
+
+    def op_metadata(self, params: Dict[str, Any]) -> Any:
+        resource, filename = params.get('resource', ''), params.get('filename', '')
+        if not _METADATA_RESOURCE_RE.match(resource) or not _METADATA_FILE_RE.match(filename):
+            raise ValueError("Recurso de metadatos inválido")
+        return self.cli.metadata._fetch(self._session(params), resource, filename, bool(params.get('refresh')))
+
+    def op_reload(self, params: Dict[str, Any]) -> int:
+        self.cli.reload_config()
+        return len(self.cli.sessions)
+
+    def op_stop(self, params: Dict[str, Any]) -> bool:
+        # El manejador responde primero y después detiene el servidor
+        self.stopping = True
+        return True
+
+    def stop(self):
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def serve_forever(self):
+        agent = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = agent.handle(json.loads(line))
+                    except ValueError:
+                        response = {'ok': False, 'error': "Petición JSON inválida"}
+                    self.wfile.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+                    if agent.stopping:
+                        agent.stop()
+                        return
+
+        if self.socket_path.exists():
+            # Un socket que no responde quedó de un agente que terminó mal
+            if AgentClient(self.socket_path).available(refresh=True):
+                raise RuntimeError(f"Ya hay un agente escuchando en {self.socket_path}")
+            self.socket_path.unlink()
+        old_umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        finally:
+            os.umask(old_umask)
+        self.server.daemon_threads = True
+        signal.signal(signal.SIGTERM, lambda *args: self.stop())
+        # Clientes y validación listos antes del primer comando
+        for name in self.cli.sessions:
+            self.cli.validate_in_background(name)
+        print(f"✓ Agente escuchando en {self.socket_path} (pid {os.getpid()}, {len(self.cli.sessions)} sesiones)", flush=True)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.cli.invalidate_client()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            print("✓ Agente detenido", flush=True)
+
+def agent_command(action: str) -> int:
+    """sf-cli.py agent start|stop|status|serve"""
+    if not hasattr(socket, 'AF_UNIX'):
+        print("❌ El agente necesita sockets Unix, no disponibles en este sistema")
+        return 1
+    if action == 'serve':
+        try:
+            SessionAgent(SalesforceCLI(use_agent=False)).serve_forever()
+        except RuntimeError as e:
+            print(f"❌ {str(e)}")
+            return 1
+        return 0
+
+    cli = SalesforceCLI(use_agent=False)
+    client = AgentClient(cli.config_dir / 'agent.sock')
+    running = client.available(refresh=True)
+    if action == 'start':
+        if running:
+            print("✓ El agente ya está corriendo")
+            return 0
+        log_path = cli.config_dir / 'agent.log'
+        with open(log_path, 'ab') as log:
+            subprocess.Popen([sys.executable, os.path.abspath(__file__), 'agent', 'serve'],
+                             stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if client.available(refresh=True):
+                print(f"✓ Agente iniciado en {client.socket_path}")
+                return 0
+            time.sleep(0.1)
+        print(f"❌ El agente no respondió; revisa {log_path}")
+        return 1
+
+    if not running:
+        print("❌ El agente no está corriendo")
+        print("💡 Inícialo con: python sf-cli.py agent start")
+        return 1 if action == 'status' else 0
+    if action == 'stop':
+        client.request('stop')
+        print("✓ Agente detenido")
+        return 0
+
+    status = client.request('status')
+    print(f"✓ Agente activo (pid {status['pid']}, {status['uptime'] / 60:.0f} min) en {status['socket']}")
+    for name, info in status['sessions'].items():
+        state = "⏳ sin verificar" if info['valid'] is None else ("✅ válida" if info['valid'] else "⚠️  expirada")
+        p95 = f" | p95 {info['p95'] * 1000:.0f} ms" if info['p95'] is not None else ""
+        print(f"   {name} ({info['username']}): {state} | {info['calls']} llamadas{p95}")
+    return 0
+
+def query_command(cli: SalesforceCLI, args) -> int:
+    """sf-cli.py query: ejecuta una consulta sin menú, por el agente si está corriendo"""
+    if args.session:
+        if args.session not in cli.sessions:
+            print(f"❌ Sesión '{args.session}' no encontrada")
+            return 1
+        cli.current_session = args.session
+    output = Path(args.output) if args.output else None
+    return 0 if QueryManager(cli).execute_query(args.soql, args.format, output) else 1
+
+def report_startup(cli: SalesforceCLI) -> int:
+    """Tiempo desde el inicio del script hasta la primera pantalla y costo de cada librería pesada.
+
+    Dibuja lo mismo que la primera vuelta del menú, incluido el estado de la sesión
+    (que consulta al agente y lanza la validación en segundo plano).
+    """
+    with redirect_stdout(io.StringIO()):
+        print_menu()
+        show_current_session(cli)
+    ready = time.perf_counter()
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"Arranque hasta el menú con la sesión: {(ready - _STARTED) * 1000:.1f} ms")
+    print(f"Librerías pesadas cargadas al inicio: {', '.join(loaded) or 'ninguna'}")
+    for name in HEAVY_MODULES:
+        if name not in sys.modules:
+            start = time.perf_counter()
+            importlib.import_module(name)
+            print(f"  {name}: {(time.perf_counter() - start) * 1000:.0f} ms en el primer uso")
+    return 0
+
+def clear_screen():
+    # Secuencia ANSI en lugar de lanzar un proceso 'clear' en cada vuelta del menú
+    if os.name == 'nt':
+        os.system('cls')
+    else:
+        print("\033[2J\033[H", end='', flush=True)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='sf-cli.py', description="SF CLI. Sin opciones abre el menú interactivo.")
+    parser.add_argument('--startup-time', action='store_true', help="Medir el arranque hasta el menú y salir")
+    sub = parser.add_subparsers(dest='command')
+
+    agent = sub.add_parser('agent', help="Agente de sesiones en segundo plano")
+    agent.add_argument('action', choices=['start', 'stop', 'status', 'serve'])
+
+    query = sub.add_parser('query', help="Ejecutar una consulta SOQL y guardar el resultado")
+    query.add_argument('soql')
+    query.add_argument('--session', help="Sesión guardada (default la sesión activa)")
+    query.add_argument('--format', choices=list(RECORD_SINKS), default='csv')
+    query.add_argument('--output')
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'agent':
+        return agent_command(args.action)
     cli = SalesforceCLI()
+    if args.command == 'query':
+        return query_command(cli, args)
     session_manager = SessionManager(cli)
     user_manager = UserManager(cli)
     record_manager = RecordManager(cli)
     query_manager = QueryManager(cli)
     org_manager = OrganizationManager(cli)
-    
+    if args.startup_time:
+        return report_startup(cli)
+
     while True:
         print_menu()
         show_current_session(cli)
@@ -650,14 +2603,16 @@ def main():
                 subchoice = input("Selección: ")
                 if subchoice == "1": record_manager.delete_record()
                 elif subchoice == "2": record_manager.replace_advisor()
-                elif subchoice == "3": break
+                elif subchoice == "3": record_manager.batch_script()
+                elif subchoice == "4": break
 
         elif choice == "4":  # Consultas SOQL
             while True:
                 print_submenu("consultas")
                 subchoice = input("Selección: ")
                 if subchoice == "1": query_manager.custom_soql()
-                elif subchoice == "2": break
+                elif subchoice == "2": query_manager.explain()
+                elif subchoice == "3": break
 
         elif choice == "5":  # Información de Organización
             while True:
@@ -666,7 +2621,10 @@ def main():
                 if subchoice == "1": org_manager.get_organization_info()
                 elif subchoice == "2": org_manager.open_browser()
                 elif subchoice == "3": org_manager.test_connection()
-                elif subchoice == "4": break
+                elif subchoice == "4": org_manager.refresh_metadata()
+                elif subchoice == "5": org_manager.multi_org()
+                elif subchoice == "6": org_manager.show_api_stats()
+                elif subchoice == "7": break
 
         elif choice == "6":  # Ayuda
             show_help()
@@ -678,7 +2636,8 @@ def main():
             print("Opción inválida, intenta nuevamente")
 
         input("\nPresiona Enter para continuar...")
-        os.system('cls' if os.name == 'nt' else 'clear')
+        clear_screen()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
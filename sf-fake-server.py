@@ -0,0 +1,498 @@
+"""Servidor local que imita la API REST de Salesforce para pruebas y benchmarks de sf-cli.
+
+Sirve login SOAP, versiones, /limits, describe global y por objeto (con
+If-Modified-Since), query/queryMore paginado con explain, sObject Collections
+y trabajos de Bulk API 2.0 (ingesta y consulta). Los datos son sintéticos y
+deterministas; la latencia por petición y el tamaño de cada objeto se
+configuran por línea de comandos.
+
+Uso:
+    python sf-fake-server.py --port 8765 --records 50000 --latency-ms 20
+"""
+import re
+import csv
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from typing import Optional, Dict, Any
+
+API_VERSION = '59.0'
+ORG_ID = '00D000000000001AAA'
+USER_ID = '005000000000001AAA'
+DAILY_API_MAX = 15000
+
+# Prefijo de Id y campos de cada objeto sintético: (nombre, tipo, relación)
+SOBJECTS = {
+    'Lead': ('00Q', [
+        ('Id', 'id', None), ('Name', 'string', None), ('Email', 'email', None),
+        ('Email2__c', 'email', None), ('CreatedDate', 'datetime', None),
+        ('OwnerId', 'reference', 'Owner'),
+    ]),
+    'Opportunity': ('006', [
+        ('Id', 'id', None), ('Name', 'string', None), ('StageName', 'picklist', None),
+        ('Arrival__c', 'date', None), ('Advisor_Pre_Arrival__c', 'reference', 'Advisor_Pre_Arrival__r'),
+        ('CreatedDate', 'datetime', None), ('OwnerId', 'reference', 'Owner'),
+    ]),
+    'Account': ('001', [
+        ('Id', 'id', None), ('Name', 'string', None), ('CreatedDate', 'datetime', None),
+        ('OwnerId', 'reference', 'Owner'),
+    ]),
+    'User': ('005', [
+        ('Id', 'id', None), ('Name', 'string', None), ('Username', 'string', None),
+    ]),
+}
+# Campos que el optimizador simulado considera indexados
+INDEXED_FIELDS = {'id', 'createddate', 'ownerid', 'advisor_pre_arrival__c', 'name'}
+STAGES = ['Prospecting', 'Qualification', 'Proposal', 'Closed Won', 'Closed Lost']
+BASE_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+BASE62 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+def make_id(prefix: str, number: int) -> str:
+    digits = ''
+    while True:
+        number, rest = divmod(number, 62)
+        digits = BASE62[rest] + digits
+        if not number:
+            break
+    return prefix + digits.rjust(12, '0') + 'AAA'
+
+def make_record(sobject: str, number: int) -> Dict[str, Any]:
+    """Registro sintético número `number` del objeto (mismo valor en cada llamada)"""
+    prefix, fields = SOBJECTS[sobject]
+    created = BASE_DATE + timedelta(minutes=37 * number)
+    values = {
+        'Id': make_id(prefix, number),
+        'Name': f"{sobject} {number}",
+        'Email': f"contacto{number % 9973}@ejemplo.com",
+        'Email2__c': None if number % 3 else f"alterno{number}@ejemplo.com",
+        'CreatedDate': created.strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+        'OwnerId': make_id('005', number % 50),
+        'StageName': STAGES[number % len(STAGES)],
+        'Arrival__c': (created + timedelta(days=30)).strftime('%Y-%m-%d'),
+        'Advisor_Pre_Arrival__c': make_id('005', number % 20),
+        'Username': f"usuario{number}@ejemplo.com",
+    }
+    record = {'attributes': {'type': sobject, 'url': f"/services/data/v{API_VERSION}/sobjects/{sobject}/{values['Id']}"}}
+    record.update((name, values[name]) for name, _, _ in fields)
+    return record
+
+class FakeOrg:
+    """Estado compartido del servidor: datos, sesiones, cursores y trabajos"""
+    def __init__(self, records: int, page_size: int, password: str, latency: float, jitter: float,
+                 fail_rate: float):
+        self.records = records
+        self.page_size = page_size
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.started = formatdate(time.time(), usegmt=True)
+        self.tokens = {'fake-token'}
+        self.cursors: Dict[str, tuple] = {}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.api_calls = 0
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def next_id(self, kind: str) -> str:
+        with self.lock:
+            self.sequence += 1
+            return make_id(kind, self.sequence)
+
+    def count_call(self) -> int:
+        with self.lock:
+            self.api_calls += 1
+            return self.api_calls
+
+def parse_soql(soql: str) -> Dict[str, Any]:
+    """Interpreta lo mínimo de la consulta: objeto, campos, filtros y LIMIT"""
+    match = re.match(r'\s*SELECT\s+(.*?)\s+FROM\s+(\w+)(.*)$', soql, re.IGNORECASE | re.DOTALL)
+    if not match:
+        raise ValueError('MALFORMED_QUERY')
+    fields, sobject, rest = match.groups()
+    canonical = {name.lower(): name for name in SOBJECTS}.get(sobject.lower())
+    if not canonical:
+        raise ValueError(f"INVALID_TYPE: sObject type '{sobject}' is not supported")
+    limit = re.search(r'\bLIMIT\s+(\d+)', rest, re.IGNORECASE)
+    where = re.search(r'\bWHERE\s+(.*?)(?:\bORDER\s+BY\b|\bLIMIT\b|$)', rest, re.IGNORECASE | re.DOTALL)
+    filters = re.findall(r'(\w+)\s*(?:!=|>=|<=|=|>|<|LIKE\b|IN\b)', where.group(1), re.IGNORECASE) if where else []
+    return {
+        'sobject': canonical,
+        'count': fields.strip().upper() == 'COUNT()',
+        'limit': int(limit.group(1)) if limit else None,
+        'filters': [name.lower() for name in filters],
+        'range_days': _range_days(where.group(1)) if where else None,
+    }
+
+def _range_days(where: str) -> Optional[int]:
+    dates = re.findall(r'(\d{4}-\d{2}-\d{2})', where)
+    if len(dates) < 2:
+        return None
+    start, end = (datetime.strptime(value, '%Y-%m-%d') for value in dates[:2])
+    return abs((end - start).days) + 1
+
+def explain(org: FakeOrg, query: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan simulado: los rangos de fechas cortos y los filtros por campos indexados son selectivos"""
+    total = org.records
+    indexed = [name for name in query['filters'] if name in INDEXED_FIELDS]
+    if query['range_days']:
+        cardinality = min(total, query['range_days'] * 40)
+    elif indexed:
+        cardinality = max(1, total // 20)
+    else:
+        cardinality = total
+    index_cost = cardinality / max(1, total * 0.1)
+    plans = [{
+        'cardinality': cardinality,
+        'fields': indexed[:1],
+        'leadingOperationType': 'Index',
+        'relativeCost': round(index_cost, 3),
+        'sobjectCardinality': total,
+        'sobjectType': query['sobject'],
+        'notes': [],
+    }] if indexed else []
+    plans.append({
+        'cardinality': cardinality,
+        'fields': [],
+        'leadingOperationType': 'TableScan',
+        'relativeCost': round(total / 300000 + 0.65, 3),
+        'sobjectCardinality': total,
+        'sobjectType': query['sobject'],
+        'notes': [{'description': 'Not considering filter for optimization because unindexed',
+                   'fields': [name for name in query['filters'] if name not in INDEXED_FIELDS],
+                   'tableEnumOrId': query['sobject']}],
+    })
+    return {'plans': sorted(plans, key=lambda plan: plan['relativeCost'])}
+
+def describe_sobject(sobject: str) -> Dict[str, Any]:
+    _, fields = SOBJECTS[sobject]
+    return {
+        'name': sobject,
+        'custom': False,
+        'queryable': True,
+        'fields': [{
+            'name': name,
+            'type': kind,
+            'length': 255 if kind in ('string', 'email') else 18 if kind in ('id', 'reference') else 0,
+            'referenceTo': ['User'] if kind == 'reference' else [],
+            'relationshipName': relationship,
+        } for name, kind, relationship in fields],
+    }
+
+LOGIN_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns="urn:partner.soap.sforce.com">
+<soapenv:Body><loginResponse><result>
+<metadataServerUrl>{server}/services/Soap/m/{version}/{org}</metadataServerUrl>
+<passwordExpired>false</passwordExpired><sandbox>true</sandbox>
+<serverUrl>{server}/services/Soap/u/{version}/{org}</serverUrl>
+<sessionId>{token}</sessionId><userId>{user}</userId>
+<userInfo><organizationId>{org}</organizationId><userName>{username}</userName></userInfo>
+</result></loginResponse></soapenv:Body></soapenv:Envelope>"""
+
+LOGIN_FAULT = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:sf="urn:fault.partner.soap.sforce.com">
+<soapenv:Body><soapenv:Fault><faultcode>INVALID_LOGIN</faultcode>
+<faultstring>INVALID_LOGIN: Invalid username, password, security token; or user locked out.</faultstring>
+<detail><sf:LoginFault><sf:exceptionCode>INVALID_LOGIN</sf:exceptionCode>
+<sf:exceptionMessage>Invalid username, password, security token; or user locked out.</sf:exceptionMessage>
+</sf:LoginFault></detail></soapenv:Fault></soapenv:Body></soapenv:Envelope>"""
+
+class FakeSalesforceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Encabezados y cuerpo salen en una sola escritura al final de cada petición
+    # y sin Nagle: escritos por separado, el ACK retrasado del cliente agregaba
+    # ~40 ms a cada respuesta y los benchmarks medían eso en lugar del cliente
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    org: FakeOrg = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- utilidades de respuesta ---
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'application/json', headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Sforce-Limit-Info', f"api-usage={self.org.api_calls}/{DAILY_API_MAX}")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _json(self, status: int, data, headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(data).encode('utf-8'), headers=headers)
+
+    def _error(self, status: int, code: str, message: str):
+        self._json(status, [{'errorCode': code, 'message': message}])
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _server_url(self) -> str:
+        return f"http://{self.headers.get('Host', '127.0.0.1')}"
+
+    def _authorized(self) -> bool:
+        token = self.headers.get('Authorization', '').replace('Bearer ', '', 1).strip()
+        if token not in self.org.tokens:
+            self._error(401, 'INVALID_SESSION_ID', 'Session expired or invalid')
+            return False
+        return True
+
+    def _not_modified(self) -> bool:
+        since = self.headers.get('If-Modified-Since')
+        if not since:
+            return False
+        try:
+            return parsedate_to_datetime(since) >= parsedate_to_datetime(self.org.started)
+        except (TypeError, ValueError):
+            return False
+
+    # --- despacho ---
+    def _dispatch(self):
+        org = self.org
+        if org.latency or org.jitter:
+            time.sleep(max(0.0, org.latency + random.uniform(-org.jitter, org.jitter)))
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip('/')
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+        if self.command == 'POST' and re.match(r'^/services/Soap/u/[\d.]+$', path):
+            return self._login()
+        if not self._authorized():
+            return
+        org.count_call()
+        if path == '/services/data':
+            return self._json(200, [{'label': 'Winter', 'url': f"/services/data/v{API_VERSION}", 'version': API_VERSION}])
+        match = re.match(r'^/services/data/v[\d.]+(?:/(.*))?$', path)
+        if not match:
+            return self._error(404, 'NOT_FOUND', 'The requested resource does not exist')
+        resource = match.group(1) or ''
+
+        if resource == 'limits':
+            return self._json(200, {'DailyApiRequests': {'Max': DAILY_API_MAX, 'Remaining': DAILY_API_MAX - org.api_calls}})
+        if resource == 'sobjects':
+            if self._not_modified():
+                return self._send(304)
+            return self._json(200, {'encoding': 'UTF-8', 'maxBatchSize': 200, 'sobjects': [
+                {'name': name, 'custom': False, 'queryable': True} for name in SOBJECTS
+            ]}, {'Last-Modified': org.started})
+        describe = re.match(r'^sobjects/(\w+)/describe$', resource)
+        if describe:
+            sobject = {name.lower(): name for name in SOBJECTS}.get(describe.group(1).lower())
+            if not sobject:
+                return self._error(404, 'NOT_FOUND', 'The requested resource does not exist')
+            if self._not_modified():
+                return self._send(304)
+            return self._json(200, describe_sobject(sobject), {'Last-Modified': org.started})
+        if resource in ('query', 'queryAll') and self.command == 'GET':
+            return self._query(params)
+        cursor = re.match(r'^query/(\w+)-(\d+)$', resource)
+        if cursor:
+            return self._query_more(cursor.group(1), int(cursor.group(2)))
+        if resource == 'composite/sobjects':
+            return self._collections(params)
+        if resource.startswith('jobs/'):
+            return self._jobs(resource[len('jobs/'):], params)
+        return self._error(404, 'NOT_FOUND', 'The requested resource does not exist')
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = lambda self: self._dispatch()
+
+    # --- login ---
+    def _login(self):
+        body = self._body().decode('utf-8', 'replace')
+        username = re.search(r'<n1:username>(.*?)</n1:username>', body)
+        password = re.search(r'<n1:password>(.*?)</n1:password>', body)
+        if not password or password.group(1) != self.org.password:
+            return self._send(500, LOGIN_FAULT.encode('utf-8'), 'text/xml')
+        token = f"{ORG_ID}!{self.org.next_id('TOK')}"
+        with self.org.lock:
+            self.org.tokens.add(token)
+        xml = LOGIN_RESPONSE.format(server=self._server_url(), version=API_VERSION, org=ORG_ID,
+                                    token=token, user=USER_ID, username=username.group(1) if username else '')
+        self._send(200, xml.encode('utf-8'), 'text/xml')
+
+    # --- consultas ---
+    def _page(self, cursor_id: str, offset: int):
+        sobject, total = self.org.cursors[cursor_id]
+        batch = self.org.page_size
+        options = re.search(r'batchSize=(\d+)', self.headers.get('Sforce-Query-Options', ''))
+        if options:
+            batch = max(200, min(2000, int(options.group(1))))
+        end = min(total, offset + batch)
+        result = {'totalSize': total, 'done': end >= total,
+                  'records': [make_record(sobject, number) for number in range(offset, end)]}
+        if end < total:
+            result['nextRecordsUrl'] = f"/services/data/v{API_VERSION}/query/{cursor_id}-{end}"
+        self._json(200, result)
+
+    def _query(self, params: Dict[str, str]):
+        soql = params.get('explain') or params.get('q')
+        if not soql:
+            return self._error(400, 'MALFORMED_QUERY', 'Missing query')
+        try:
+            query = parse_soql(soql)
+        except ValueError as e:
+            return self._error(400, str(e).split(':')[0], str(e))
+        if 'explain' in params:
+            return self._json(200, explain(self.org, query))
+        total = self.org.records if query['limit'] is None else min(self.org.records, query['limit'])
+        if query['count']:
+            return self._json(200, {'totalSize': total, 'done': True, 'records': []})
+        cursor_id = self.org.next_id('01g')
+        with self.org.lock:
+            self.org.cursors[cursor_id] = (query['sobject'], total)
+        self._page(cursor_id, 0)
+
+    def _query_more(self, cursor_id: str, offset: int):
+        if cursor_id not in self.org.cursors:
+            return self._error(400, 'INVALID_QUERY_LOCATOR', 'invalid query locator')
+        self._page(cursor_id, offset)
+
+    # --- sObject Collections ---
+    def _result(self, record_id: str) -> Dict[str, Any]:
+        if self.org.fail_rate and random.random() < self.org.fail_rate:
+            return {'id': record_id, 'success': False,
+                    'errors': [{'statusCode': 'FIELD_CUSTOM_VALIDATION_EXCEPTION', 'message': 'Regla de validación simulada', 'fields': []}]}
+        return {'id': record_id, 'success': True, 'errors': []}
+
+    def _collections(self, params: Dict[str, str]):
+        if self.command == 'DELETE':
+            ids = [record_id for record_id in params.get('ids', '').split(',') if record_id]
+        elif self.command == 'PATCH':
+            ids = [record.get('Id') for record in json.loads(self._body() or b'{}').get('records', [])]
+        else:
+            return self._error(405, 'METHOD_NOT_ALLOWED', 'HTTP Method not allowed')
+        if len(ids) > 200:
+            return self._error(400, 'EXCEEDED_ID_LIMIT', 'record limit reached. cannot submit more than 200 records into this call')
+        self._json(200, [self._result(record_id) for record_id in ids])
+
+    # --- Bulk API 2.0 ---
+    def _jobs(self, resource: str, params: Dict[str, str]):
+        org = self.org
+        if resource in ('ingest', 'query') and self.command == 'POST':
+            spec = json.loads(self._body() or b'{}')
+            job_id = org.next_id('750')
+            job = {'id': job_id, 'kind': resource, 'operation': spec.get('operation'), 'object': spec.get('object'),
+                   'state': 'Open' if resource == 'ingest' else 'JobComplete', 'rows': [], 'header': [],
+                   'query': spec.get('query')}
+            if resource == 'query':
+                try:
+                    query = parse_soql(spec.get('query', ''))
+                except ValueError as e:
+                    return self._error(400, 'INVALIDJOB', str(e))
+                job['object'] = query['sobject']
+                job['total'] = org.records if query['limit'] is None else min(org.records, query['limit'])
+            with org.lock:
+                org.jobs[job_id] = job
+            return self._json(200, self._job_info(job))
+
+        match = re.match(r'^(ingest|query)/(\w+)(?:/(\w+))?$', resource)
+        if not match or match.group(2) not in org.jobs:
+            return self._error(404, 'NOT_FOUND', 'The requested resource does not exist')
+        kind, job_id, action = match.groups()
+        job = org.jobs[job_id]
+        if action == 'batches' and self.command == 'PUT':
+            rows = list(csv.reader(io.StringIO(self._body().decode('utf-8'))))
+            job['header'], job['rows'] = rows[0] if rows else [], job['rows'] + rows[1:]
+            return self._send(201)
+        if action is None and self.command == 'PATCH':
+            state = json.loads(self._body() or b'{}').get('state')
+            job['state'] = 'JobComplete' if state == 'UploadComplete' else state
+            job['results'] = [self._result(row[0]) for row in job['rows']]
+            return self._json(200, self._job_info(job))
+        if action is None and self.command == 'GET':
+            return self._json(200, self._job_info(job))
+        if kind == 'ingest' and action in ('successfulResults', 'failedResults', 'unprocessedrecords'):
+            return self._ingest_results(job, action)
+        if kind == 'query' and action == 'results':
+            return self._query_results(job, params)
+        return self._error(404, 'NOT_FOUND', 'The requested resource does not exist')
+
+    def _job_info(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        results = job.get('results', [])
+        return {
+            'id': job['id'], 'operation': job['operation'], 'object': job['object'], 'state': job['state'],
+            'contentType': 'CSV', 'apiVersion': float(API_VERSION),
+            'numberRecordsProcessed': len(results) if job['kind'] == 'ingest' else job.get('total', 0),
+            'numberRecordsFailed': sum(1 for result in results if not result['success']),
+        }
+
+    def _ingest_results(self, job: Dict[str, Any], action: str):
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator='\n')
+        if action == 'successfulResults':
+            writer.writerow(['sf__Id', 'sf__Created'] + job['header'])
+            writer.writerows([result['id'], 'false'] + row for row, result in zip(job['rows'], job.get('results', [])) if result['success'])
+        elif action == 'failedResults':
+            writer.writerow(['sf__Id', 'sf__Error'] + job['header'])
+            writer.writerows([result['id'], result['errors'][0]['message']] + row
+                             for row, result in zip(job['rows'], job.get('results', [])) if not result['success'])
+        else:
+            writer.writerow(job['header'])
+        self._send(200, out.getvalue().encode('utf-8'), 'text/csv')
+
+    def _query_results(self, job: Dict[str, Any], params: Dict[str, str]):
+        _, fields = SOBJECTS[job['object']]
+        offset = int(params.get('locator') or 0)
+        end = min(job['total'], offset + int(params.get('maxRecords') or 50000))
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow([name for name, _, _ in fields])
+        for number in range(offset, end):
+            record = make_record(job['object'], number)
+            writer.writerow(['' if record[name] is None else record[name] for name, _, _ in fields])
+        self._send(200, out.getvalue().encode('utf-8'), 'text/csv', {
+            'Sforce-NumberOfRecords': str(end - offset),
+            'Sforce-Locator': str(end) if end < job['total'] else 'null',
+        })
+
+def build_server(host: str = '127.0.0.1', port: int = 0, records: int = 10000, page_size: int = 2000,
+                 password: str = 'secret123456', latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Crea el servidor (puerto 0 = libre) sin arrancarlo; usado también por sf-bench.py"""
+    org = FakeOrg(records, page_size, password, latency_ms / 1000, jitter_ms / 1000, fail_rate)
+    handler = type('Handler', (FakeSalesforceHandler,), {'org': org})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.org = org
+    return server
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor falso de Salesforce para pruebas locales de sf-cli")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--records', type=int, default=10000, help="registros por objeto")
+    parser.add_argument('--page-size', type=int, default=2000, help="registros por página de query")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="latencia añadida a cada petición")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="variación aleatoria de la latencia")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fracción de registros que fallan en escrituras")
+    parser.add_argument('--password', default='secret123456', help="password + security token que acepta el login")
+    args = parser.parse_args(argv)
+
+    server = build_server(args.host, args.port, args.records, args.page_size, args.password,
+                          args.latency_ms, args.jitter_ms, args.fail_rate)
+    host, port = server.server_address[:2]
+    print(f"✓ Salesforce falso en http://{host}:{port} ({args.records} registros por objeto)")
+    print("💡 Token fijo: fake-token | instance_url: "
+          f"http://{host}:{port}/services/data/v{API_VERSION}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n¡Hasta pronto! ✨")
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())